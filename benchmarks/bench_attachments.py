@@ -0,0 +1,132 @@
+"""Attachment archiver throughput and dedup ratio against a local HTTP stand-in.
+
+Serves a fixed set of payloads from an aiohttp server, where many attachments share the
+same content, and archives them through AttachmentArchiver at several concurrency levels.
+A second pass over the same attachments shows that rebuilt transcripts don't download again.
+
+    python benchmarks/bench_attachments.py --files 200 --unique 50 --size-kb 256 --latency-ms 20
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_bot(workdir: str):
+    # main.py only needs its required variables set and a scratch database to import
+    os.environ.setdefault("APPLICATION_ID", "1")
+    os.environ.setdefault("BOT_TOKEN", "benchmark")
+    os.environ["DB_PATH"] = os.path.join(workdir, "tickets.db")
+    os.environ["ARCHIVE_DB_PATH"] = os.path.join(workdir, "tickets_archive.db")
+    spec = importlib.util.spec_from_file_location("ticketbot", os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StandInAttachment:
+    def __init__(self, session: aiohttp.ClientSession, attachment_id: int, url: str, size: int):
+        self.id = attachment_id
+        self.url = url
+        self.size = size
+        self._session = session
+
+    async def read(self) -> bytes:
+        async with self._session.get(self.url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+
+async def start_server(payloads, latency: float, hits: list):
+    async def blob(request):
+        hits[0] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return web.Response(body=payloads[int(request.match_info["index"])])
+
+    app = web.Application()
+    app.router.add_get("/blob/{index}", blob)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def store_size(root: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+async def run(args, bot):
+    rng = random.Random(args.seed)
+    size = args.size_kb * 1024
+    payloads = [rng.randbytes(size) for _ in range(args.unique)]
+    hits = [0]
+    runner, base_url = await start_server(payloads, args.latency_ms / 1000, hits)
+
+    print(f"{args.files} attachments, {args.unique} unique x {args.size_kb} KiB, "
+          f"{args.latency_ms} ms server latency")
+    print(f"{'concurrency':>11} {'seconds':>8} {'MiB/s':>8} {'stored MiB':>11} {'dedup':>6} {'rerun GETs':>11}")
+    try:
+        async with aiohttp.ClientSession() as session:
+            for concurrency in args.concurrency:
+                bot.c.execute("DELETE FROM attachment_store")
+                bot.c.execute("DELETE FROM attachment_refs")
+                with tempfile.TemporaryDirectory() as store_dir:
+                    archiver = bot.AttachmentArchiver(store_dir, 1 << 40, size * 2, concurrency)
+                    attachments = [
+                        StandInAttachment(session, index + 1, f"{base_url}/blob/{rng.randrange(args.unique)}", size)
+                        for index in range(args.files)
+                    ]
+
+                    hits[0] = 0
+                    started = time.perf_counter()
+                    archived = await archiver.archive_many(attachments)
+                    elapsed = time.perf_counter() - started
+                    downloaded = hits[0] * size
+                    stored = store_size(store_dir)
+                    missing = sum(1 for digest in archived.values() if digest is None)
+
+                    # Same attachments again, as when a transcript is rebuilt
+                    hits[0] = 0
+                    await archiver.archive_many(attachments)
+                    rerun = hits[0]
+
+                print(f"{concurrency:>11} {elapsed:>8.2f} {downloaded / elapsed / 2**20:>8.1f} "
+                      f"{stored / 2**20:>11.1f} {args.files * size / max(stored, 1):>5.1f}x {rerun:>11}"
+                      + (f"  ({missing} not archived)" if missing else ""))
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        bot = load_bot(workdir)
+        asyncio.run(run(args, bot))
+        bot.conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Resident member-cache size per 100k guild members for each MEMBER_CACHE_POLICY.
+
+"full" adds every member to discord.py's own member cache, as chunking at startup does.
+"lean" leaves the library cache empty and sends the same members through MemberCache the
+way the bot does: open-ticket participants and staff are pinned, and everyone else who
+interacts passes through the bounded LRU. Each policy runs in a fresh subprocess so the
+resident size of one doesn't leak into the other.
+
+    python benchmarks/bench_member_cache.py --members 100000 --participants 500 --staff 50
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUILD_ID = 1
+STAFF_ROLE_ID = 2
+
+
+def load_bot(workdir: str, policy: str):
+    # main.py only needs its required variables set and a scratch database to import
+    os.environ.setdefault("APPLICATION_ID", "1")
+    os.environ.setdefault("BOT_TOKEN", "benchmark")
+    os.environ["SUPPORT_ROLE_ID"] = str(STAFF_ROLE_ID)
+    os.environ["MEMBER_CACHE_POLICY"] = policy
+    os.environ["DB_PATH"] = os.path.join(workdir, "tickets.db")
+    os.environ["ARCHIVE_DB_PATH"] = os.path.join(workdir, "tickets_archive.db")
+    spec = importlib.util.spec_from_file_location("ticketbot", os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def make_guild(bot):
+    import discord
+    from discord.state import ConnectionState
+
+    state = ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None,
+                            intents=bot.intents, member_cache_flags=bot.member_cache_flags)
+    role = {"position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False, "permissions": "0"}
+    guild = discord.Guild(state=state, data={
+        "id": str(GUILD_ID),
+        "name": "benchmark",
+        "roles": [dict(role, id=str(GUILD_ID), name="@everyone"), dict(role, id=str(STAFF_ROLE_ID), name="Support")],
+        "member_count": 0
+    })
+    return guild, state
+
+
+def make_member(guild, state, index: int, staff: bool):
+    import discord
+
+    return discord.Member(guild=guild, state=state, data={
+        "user": {"id": str(10**17 + index), "username": f"member{index}", "discriminator": "0",
+                 "global_name": f"Member {index}", "avatar": None},
+        "roles": [str(STAFF_ROLE_ID)] if staff else [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0
+    })
+
+
+def measure(args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        bot = load_bot(workdir, args.policy)
+        rng = random.Random(args.seed)
+        staff = set(rng.sample(range(args.members), args.staff))
+
+        gc.collect()
+        tracemalloc.start()
+        rss_before = resident_bytes()
+        guild, state = make_guild(bot)
+
+        if args.policy == "full":
+            for index in range(args.members):
+                guild._add_member(make_member(guild, state, index, index in staff))
+        else:
+            # Staff and ticket participants stay pinned; other members only show up when
+            # they interact and are otherwise fetched on demand
+            for channel_id, index in enumerate(rng.sample(range(args.members), args.participants)):
+                bot.member_cache.pin(channel_id, make_member(guild, state, index, index in staff))
+            for index in staff:
+                bot.member_cache.remember(make_member(guild, state, index, True))
+            for index in rng.choices(range(args.members), k=args.interactions):
+                bot.member_cache.remember(make_member(guild, state, index, index in staff))
+
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+        rss = resident_bytes() - rss_before
+        cached = len(guild._members) + len(bot.member_cache._pinned) + len(bot.member_cache._lru)
+        bot.conn.close()
+    scale = 100_000 / args.members
+    return {"policy": args.policy, "cached": cached, "traced": traced * scale, "rss": rss * scale}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--participants", type=int, default=500, help="members with an open ticket")
+    parser.add_argument("--staff", type=int, default=50)
+    parser.add_argument("--interactions", type=int, default=20_000, help="interactions from random members (lean)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policy", choices=("full", "lean"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.policy:
+        print(json.dumps(measure(args)))
+        return
+
+    print(f"{args.members} members, {args.participants} with open tickets, {args.staff} staff, "
+          f"LRU size {os.environ.get('MEMBER_LRU_SIZE', '1000')}")
+    print(f"{'policy':>6} {'cached':>8} {'traced MiB/100k':>16} {'RSS MiB/100k':>13}")
+    for policy in ("full", "lean"):
+        output = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--policy", policy],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{policy:>6} {result['cached']:>8} {result['traced'] / 2**20:>16.1f} {result['rss'] / 2**20:>13.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
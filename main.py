@@ -4,10 +4,22 @@ from discord.ext import commands
 import sqlite3
 import datetime
 import asyncio
+import hashlib
+import bisect
+import contextlib
+import heapq
+import itertools
+import time
 import os
 import sys
+import tempfile
 import json
-from typing import Optional, List, Literal
+import re
+import io
+import zipfile
+import zlib
+from collections import OrderedDict
+from typing import Optional, List, Literal, Dict, Tuple, Set, FrozenSet
 
 # Initialize bot
 intents = discord.Intents.default()
@@ -20,17 +32,52 @@ try:
     BOT_TOKEN = os.environ["BOT_TOKEN"]
     SUPPORT_ROLE_ID = int(os.environ.get("SUPPORT_ROLE_ID", "0") or 0)  # Handle empty strings
     LOG_CHANNEL_ID = int(os.environ.get("LOG_CHANNEL_ID", "0") or 0)
+    # "full" caches every guild member, "lean" only ticket participants and staff
+    MEMBER_CACHE_POLICY = os.environ.get("MEMBER_CACHE_POLICY", "full").lower()
+    if MEMBER_CACHE_POLICY not in ("full", "lean"):
+        raise ValueError(f"MEMBER_CACHE_POLICY must be 'full' or 'lean', got '{MEMBER_CACHE_POLICY}'")
+    MEMBER_LRU_SIZE = int(os.environ.get("MEMBER_LRU_SIZE", "1000") or 1000)
+    # Closed tickets older than this many days move to the archive database (0 disables)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30") or 0)
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "100") or 100)
+    # Hours of inactivity before a ticket is reminded, escalated or closed (0 disables each)
+    TICKET_REMIND_HOURS = float(os.environ.get("TICKET_REMIND_HOURS", "24") or 0)
+    TICKET_ESCALATE_HOURS = float(os.environ.get("TICKET_ESCALATE_HOURS", "48") or 0)
+    TICKET_AUTOCLOSE_HOURS = float(os.environ.get("TICKET_AUTOCLOSE_HOURS", "72") or 0)
+    # Per-guild ticket creation budget: sustained tickets per minute and burst size
+    TICKET_CREATE_RATE = float(os.environ.get("TICKET_CREATE_RATE", "10") or 10)
+    TICKET_CREATE_BURST = int(os.environ.get("TICKET_CREATE_BURST", "5") or 5)
+    # Local content-addressed copies of ticket attachments (empty directory disables)
+    ATTACHMENT_ARCHIVE_DIR = os.environ.get("ATTACHMENT_ARCHIVE_DIR", "")
+    ATTACHMENT_ARCHIVE_MAX_MB = int(os.environ.get("ATTACHMENT_ARCHIVE_MAX_MB", "1024") or 1024)
+    ATTACHMENT_MAX_FILE_MB = int(os.environ.get("ATTACHMENT_MAX_FILE_MB", "25") or 25)
+    ATTACHMENT_DOWNLOAD_CONCURRENCY = int(os.environ.get("ATTACHMENT_DOWNLOAD_CONCURRENCY", "4") or 4)
 except (ValueError, KeyError) as e:
     print(f"ERROR: Environment variable issue - {e}")
     print("Required variables: APPLICATION_ID and BOT_TOKEN")
     sys.exit(1)
 
-bot = commands.Bot(command_prefix="!", intents=intents, application_id=APPLICATION_ID)
+# The lean policy skips member chunking and the library's member cache entirely;
+# MemberCache below keeps only the members the bot actually works with
+if MEMBER_CACHE_POLICY == "lean":
+    member_cache_flags = discord.MemberCacheFlags.none()
+else:
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+bot = commands.Bot(
+    command_prefix="!",
+    intents=intents,
+    application_id=APPLICATION_ID,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=MEMBER_CACHE_POLICY == "full"
+)
 
 # Database setup
 DB_PATH = os.environ.get("DB_PATH", "tickets.db")
+ARCHIVE_DB_PATH = os.environ.get("ARCHIVE_DB_PATH", "tickets_archive.db")
 conn = sqlite3.connect(DB_PATH, isolation_level=None)
 c = conn.cursor()
+c.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
 
 # Create tables with improved schema
 c.execute('''
@@ -44,7 +91,11 @@ CREATE TABLE IF NOT EXISTS tickets (
     assigned_to INTEGER,
     priority TEXT DEFAULT 'medium',
     custom_data TEXT,
-    guild_id INTEGER NOT NULL
+    guild_id INTEGER NOT NULL,
+    panel_id INTEGER,
+    preset_id INTEGER,
+    closed_at TIMESTAMP,
+    control_message_id INTEGER
 )''')
 
 c.execute('''
@@ -52,7 +103,8 @@ CREATE TABLE IF NOT EXISTS guild_config (
     guild_id INTEGER PRIMARY KEY,
     ticket_role_id INTEGER,
     category_id INTEGER,
-    ping_role_id INTEGER
+    ping_role_id INTEGER,
+    one_ticket_per_user INTEGER DEFAULT 0
 )''')
 
 c.execute('''
@@ -86,11 +138,243 @@ CREATE TABLE IF NOT EXISTS ticket_presets (
     UNIQUE(guild_id, name)
 )''')
 
+# Overflow categories opened once the primary ticket category fills up
+c.execute('''
+CREATE TABLE IF NOT EXISTS ticket_categories (
+    guild_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, category_id)
+)''')
+
+# Ticket provisioning jobs with per-step checkpoints; finished and failed jobs are deleted
+c.execute('''
+CREATE TABLE IF NOT EXISTS ticket_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    panel_id INTEGER,
+    preset_id INTEGER,
+    custom_data TEXT NOT NULL,
+    interaction_token TEXT,
+    followup_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    step TEXT NOT NULL DEFAULT 'channel',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    ticket_number INTEGER,
+    channel_id INTEGER,
+    message_id INTEGER,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_ticket_jobs_status ON ticket_jobs (status)")
+
+# Bulk close operations and their per-ticket checkpoints, kept until the run finishes
+c.execute('''
+CREATE TABLE IF NOT EXISTS bulk_operations (
+    op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    requested_by INTEGER NOT NULL,
+    concurrency INTEGER NOT NULL DEFAULT 4,
+    status TEXT NOT NULL DEFAULT 'running',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)''')
+
+c.execute('''
+CREATE TABLE IF NOT EXISTS bulk_operation_items (
+    op_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    ticket_id INTEGER NOT NULL,
+    channel_name TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    transcript BLOB,
+    PRIMARY KEY (op_id, channel_id)
+)''')
+
+# Archived attachment blobs by content hash, and which Discord attachment maps to which blob
+c.execute('''
+CREATE TABLE IF NOT EXISTS attachment_store (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_attachment_store_last_used ON attachment_store (last_used)")
+
+c.execute('''
+CREATE TABLE IF NOT EXISTS attachment_refs (
+    attachment_id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL
+)''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_attachment_refs_sha256 ON attachment_refs (sha256)")
+
+# Untracked channels in ticket categories already reported for review, so reconnects
+# don't report them again
+c.execute('''
+CREATE TABLE IF NOT EXISTS flagged_channels (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL
+)''')
+
+# Pending idle-ticket deadlines, reloaded into the scheduler's heap on startup
+c.execute('''
+CREATE TABLE IF NOT EXISTS ticket_timers (
+    channel_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, kind)
+)''')
+
+# Full-text index over ticket form answers and transcripts. The guild is stored as an
+# indexed "g<id>" token so guild filtering happens inside the FTS lookup itself.
+c.execute('''
+CREATE VIRTUAL TABLE IF NOT EXISTS ticket_search USING fts5(
+    content,
+    guild,
+    kind UNINDEXED,
+    ticket_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)''')
+
+# Bring databases created by older versions up to the current schema
+def ensure_column(table: str, column: str, definition: str):
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in c.fetchall()]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+ensure_column("tickets", "panel_id", "INTEGER")
+ensure_column("tickets", "preset_id", "INTEGER")
+ensure_column("tickets", "closed_at", "TIMESTAMP")
+ensure_column("tickets", "control_message_id", "INTEGER")
+ensure_column("guild_config", "one_ticket_per_user", "INTEGER DEFAULT 0")
+ensure_column("guild_config", "last_ticket_number", "INTEGER")
+
+c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets (channel_id)")
+c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_closed ON tickets (status, closed_at)")
+c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets (guild_id, user_id, status)")
+c.execute("CREATE INDEX IF NOT EXISTS idx_tickets_guild_status ON tickets (guild_id, status)")
+
+# Tickets closed before closed_at existed are aged from their creation time
+c.execute("UPDATE tickets SET closed_at = created_at WHERE status = 'closed' AND closed_at IS NULL")
+
+# Cold storage for old closed tickets. Only the columns needed for lookups, search
+# filters and numbering stay uncompressed; the full row and transcript live in payload.
+c.execute('''
+CREATE TABLE IF NOT EXISTS archive.archived_tickets (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT,
+    preset_id INTEGER,
+    created_at TIMESTAMP,
+    closed_at TIMESTAMP,
+    archived_at TIMESTAMP,
+    payload BLOB NOT NULL
+)''')
+c.execute("CREATE INDEX IF NOT EXISTS archive.idx_archived_guild_user ON archived_tickets (guild_id, user_id)")
+c.execute("CREATE INDEX IF NOT EXISTS archive.idx_archived_channel ON archived_tickets (channel_id)")
+
+# Search index for archived tickets. It is contentless: the indexed text only lives in the
+# compressed payload, so archiving doesn't leave a second, uncompressed copy behind.
+c.execute('''
+CREATE VIRTUAL TABLE IF NOT EXISTS archive.archived_search USING fts5(
+    content,
+    guild,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+)''')
+
 conn.commit()
 
 # Configuration
 DEFAULT_CATEGORY_NAME = "Support Tickets"
+CATEGORY_CHANNEL_LIMIT = 50  # Discord's per-category channel cap
+CATEGORY_HEADROOM = 5  # free slots kept available ahead of demand
+CHANNEL_CACHE_TIMEOUT = 30  # seconds a created channel's slot stays reserved awaiting its gateway event
 PRIORITIES = {"🟢 Low": "low", "🟡 Medium": "medium", "🔴 High": "high", "🚨 Critical": "critical"}
+SEARCH_PAGE_SIZE = 10
+PRESETS_PAGE_SIZE = 10
+AUTOCOMPLETE_LIMIT = 25  # Discord's maximum number of autocomplete choices
+CHOICE_MAX_LENGTH = 100  # Discord's cap on both the name and the value of a choice
+IDLE_TIMERS = {
+    kind: hours * 3600
+    for kind, hours in (("remind", TICKET_REMIND_HOURS), ("escalate", TICKET_ESCALATE_HOURS),
+                        ("autoclose", TICKET_AUTOCLOSE_HOURS))
+    if hours > 0
+}
+TIMER_FLUSH_INTERVAL = 30  # seconds between batched writes of rescheduled deadlines
+TIMER_TOUCH_GRANULARITY = 60  # activity closer together than this doesn't move deadlines
+# Each ticket owns a fixed block of FTS rowids so an entry can be replaced by rowid
+SEARCH_KINDS = {"fields": 0, "transcript": 1}
+
+# Member cache: ticket participants and staff stay pinned, everyone else lives in a
+# bounded LRU and is fetched from the API on a miss
+class MemberCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._pinned: Dict[Tuple[int, int], discord.Member] = {}
+        self._refs: Dict[Tuple[int, int], int] = {}
+        self._channels: Dict[int, Set[Tuple[int, int]]] = {}
+        self._lru: "OrderedDict[Tuple[int, int], discord.Member]" = OrderedDict()
+
+    @staticmethod
+    def is_staff(member: discord.Member) -> bool:
+        if member.guild_permissions.administrator:
+            return True
+        return bool(SUPPORT_ROLE_ID) and any(role.id == SUPPORT_ROLE_ID for role in member.roles)
+
+    def get(self, guild_id: int, user_id: int) -> Optional[discord.Member]:
+        key = (guild_id, user_id)
+        member = self._pinned.get(key)
+        if member is None:
+            member = self._lru.get(key)
+            if member is not None:
+                self._lru.move_to_end(key)
+        return member
+
+    def remember(self, member: discord.Member):
+        if not isinstance(member, discord.Member):
+            return
+        key = (member.guild.id, member.id)
+        if key in self._refs or self.is_staff(member):
+            self._pinned[key] = member
+            self._lru.pop(key, None)
+            return
+        
+        # Not a participant (anymore) and not staff - keep it evictable
+        self._pinned.pop(key, None)
+        self._lru[key] = member
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def pin(self, channel_id: int, member: discord.Member):
+        key = (member.guild.id, member.id)
+        keys = self._channels.setdefault(channel_id, set())
+        if key not in keys:
+            keys.add(key)
+            self._refs[key] = self._refs.get(key, 0) + 1
+        self.remember(member)
+
+    def release(self, channel_id: int):
+        for key in self._channels.pop(channel_id, ()):
+            self._refs[key] -= 1
+            if self._refs[key] > 0:
+                continue
+            del self._refs[key]
+            member = self._pinned.pop(key, None)
+            if member is not None:
+                self.remember(member)
+
+    async def fetch(self, guild: discord.Guild, user_id: int) -> discord.Member:
+        member = guild.get_member(user_id) or self.get(guild.id, user_id)
+        if member is None:
+            member = await guild.fetch_member(user_id)
+            self.remember(member)
+        return member
+
+member_cache = MemberCache(MEMBER_LRU_SIZE)
 
 # Utility functions
 async def send_popup(interaction: discord.Interaction, title: str, message: str, is_error: bool = False):
@@ -104,9 +388,33 @@ async def send_popup(interaction: discord.Interaction, title: str, message: str,
     else:
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+def set_guild_config(guild_id: int, column: str, value):
+    # Upsert so setting one option doesn't reset the others
+    c.execute(f'''
+    INSERT INTO guild_config (guild_id, {column}) VALUES (?, ?)
+    ON CONFLICT(guild_id) DO UPDATE SET {column} = excluded.{column}
+    ''', (guild_id, value))
+    conn.commit()
+
 def get_next_ticket_number(guild_id: int) -> int:
     c.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=?", (guild_id,))
-    return c.fetchone()[0] + 1
+    hot_count = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM archive.archived_tickets WHERE guild_id=?", (guild_id,))
+    return hot_count + c.fetchone()[0] + 1
+
+# Numbers are handed out from a per-guild counter when a ticket is requested, so tickets
+# still being provisioned never share a number. The row count is the floor for guilds
+# whose tickets predate the counter.
+def reserve_ticket_number(guild_id: int) -> int:
+    floor = get_next_ticket_number(guild_id) - 1
+    c.execute('''
+    INSERT INTO guild_config (guild_id, last_ticket_number) VALUES (?, ?)
+    ON CONFLICT(guild_id) DO UPDATE SET last_ticket_number = MAX(COALESCE(last_ticket_number, 0), ?) + 1
+    ''', (guild_id, floor + 1, floor))
+    c.execute("SELECT last_ticket_number FROM guild_config WHERE guild_id = ?", (guild_id,))
+    number = c.fetchone()[0]
+    conn.commit()
+    return number
 
 async def log_action(guild_id: int, message: str):
     if LOG_CHANNEL_ID:
@@ -119,21 +427,364 @@ async def log_action(guild_id: int, message: str):
             )
             await channel.send(embed=embed)
 
-async def create_transcript(channel: discord.TextChannel) -> str:
-    transcript = []
+# Content-addressed attachment store. Files are named by their SHA-256 so the same upload
+# in several tickets is stored once; the least recently used blobs are evicted past the cap.
+class AttachmentArchiver:
+    def __init__(self, root: str, max_bytes: int, max_file_bytes: int, concurrency: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._slots = asyncio.Semaphore(concurrency)
+        c.execute("SELECT COALESCE(SUM(size), 0) FROM attachment_store")
+        self._total = c.fetchone()[0]
+    
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+    
+    def _touch(self, digest: str):
+        c.execute("UPDATE attachment_store SET last_used = ? WHERE sha256 = ?", (time.time(), digest))
+    
+    @staticmethod
+    def _write(path: str, data: bytes):
+        # Each writer gets its own temp file, so concurrent downloads of the same content
+        # never share one; whichever rename lands last installs identical bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+    
+    async def archive(self, attachment: discord.Attachment) -> Optional[str]:
+        # Attachments archived by an earlier transcript aren't downloaded again
+        c.execute("SELECT sha256 FROM attachment_refs WHERE attachment_id = ?", (attachment.id,))
+        result = c.fetchone()
+        if result and os.path.exists(self.path(result[0])):
+            self._touch(result[0])
+            return result[0]
+        
+        if attachment.size > self.max_file_bytes:
+            return None
+        async with self._slots:
+            data = await attachment.read()
+        
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            await asyncio.to_thread(self._write, path, data)
+        # Identical uploads downloaded concurrently must only be counted once
+        c.execute("SELECT 1 FROM attachment_store WHERE sha256 = ?", (digest,))
+        if c.fetchone():
+            self._touch(digest)
+        else:
+            c.execute("INSERT INTO attachment_store (sha256, size, last_used) VALUES (?, ?, ?)",
+                      (digest, len(data), time.time()))
+            self._total += len(data)
+        c.execute("INSERT OR REPLACE INTO attachment_refs (attachment_id, sha256) VALUES (?, ?)", (attachment.id, digest))
+        conn.commit()
+        return digest
+    
+    async def archive_many(self, attachments: List[discord.Attachment]) -> Dict[int, Optional[str]]:
+        results = await asyncio.gather(*(self.archive(attachment) for attachment in attachments), return_exceptions=True)
+        archived = {}
+        for attachment, result in zip(attachments, results):
+            if isinstance(result, BaseException):
+                print(f"Error archiving attachment {attachment.url}: {result}")
+                result = None
+            archived[attachment.id] = result
+        self.evict()
+        return archived
+    
+    def evict(self):
+        while self._total > self.max_bytes:
+            c.execute("SELECT sha256, size FROM attachment_store ORDER BY last_used LIMIT 100")
+            rows = c.fetchall()
+            if not rows:
+                break
+            victims = []
+            for digest, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path(digest))
+                except FileNotFoundError:
+                    pass
+                self._total -= size
+                victims.append((digest, size))
+            c.executemany("DELETE FROM attachment_store WHERE sha256 = ?", [(digest,) for digest, _ in victims])
+            c.executemany("DELETE FROM attachment_refs WHERE sha256 = ?", [(digest,) for digest, _ in victims])
+            conn.commit()
+
+attachment_archiver = AttachmentArchiver(
+    ATTACHMENT_ARCHIVE_DIR,
+    ATTACHMENT_ARCHIVE_MAX_MB * 1024 * 1024,
+    ATTACHMENT_MAX_FILE_MB * 1024 * 1024,
+    ATTACHMENT_DOWNLOAD_CONCURRENCY
+) if ATTACHMENT_ARCHIVE_DIR else None
+
+async def build_transcript(channel: discord.TextChannel) -> str:
+    entries = []
     async for message in channel.history(limit=None, oldest_first=True):
         content = message.content
         if message.embeds:
             content += "\n[Embed Content]"
-        if message.attachments:
-            content += "\n" + "\n".join([a.url for a in message.attachments])
-        transcript.append(f"{message.created_at} - {message.author.display_name}: {content}")
+        entries.append((f"{message.created_at} - {message.author.display_name}: {content}", message.attachments))
     
+    # Download every attachment in the channel concurrently before writing references
+    archived = {}
+    if attachment_archiver:
+        archived = await attachment_archiver.archive_many([a for _, attachments in entries for a in attachments])
+    
+    transcript = []
+    for line, attachments in entries:
+        if attachments:
+            line += "\n" + "\n".join(
+                f"{a.url} [archived: sha256:{archived[a.id]}]" if archived.get(a.id) else a.url
+                for a in attachments
+            )
+        transcript.append(line)
+    
+    state = get_ticket_state(channel.id)
+    if state:
+        index_ticket_text(state.ticket_id, channel.guild.id, "transcript", "\n".join(transcript))
+    return "\n".join(transcript)
+
+async def create_transcript(channel: discord.TextChannel) -> str:
     filename = f"transcript-{channel.id}.txt"
+    transcript = await build_transcript(channel)
     with open(filename, "w", encoding="utf-8") as f:
-        f.write("\n".join(transcript))
+        f.write(transcript)
     return filename
 
+# Search index helpers
+def index_ticket_text(ticket_id: int, guild_id: int, kind: str, content: str):
+    rowid = ticket_id * len(SEARCH_KINDS) + SEARCH_KINDS[kind]
+    c.execute("DELETE FROM ticket_search WHERE rowid = ?", (rowid,))
+    c.execute("INSERT INTO ticket_search (rowid, content, guild, kind, ticket_id) VALUES (?, ?, ?, ?, ?)",
+              (rowid, content, f"g{guild_id}", kind, ticket_id))
+    conn.commit()
+
+def ticket_fields_text(custom_data: dict) -> str:
+    lines = [custom_data.get("title", "")]
+    lines += [f"{name}: {value}" for name, value in custom_data.get("fields", {}).items() if value]
+    return "\n".join(lines)
+
+def index_ticket_fields(ticket_id: int, guild_id: int, custom_data: dict):
+    index_ticket_text(ticket_id, guild_id, "fields", ticket_fields_text(custom_data))
+
+# Indexes the form answers of tickets that have no search entry yet: tickets created
+# before the index existed, or adopted by reconciliation. Returns the last id scanned.
+def index_missing_fields(after_id: int, limit: int) -> Optional[int]:
+    c.execute(f'''
+    SELECT id, guild_id, custom_data FROM tickets t
+    WHERE id > ? AND NOT EXISTS (SELECT 1 FROM ticket_search WHERE rowid = t.id * {len(SEARCH_KINDS)})
+    ORDER BY id LIMIT ?
+    ''', (after_id, limit))
+    rows = c.fetchall()
+    if not rows:
+        return None
+    
+    entries = []
+    for ticket_id, guild_id, custom_data in rows:
+        try:
+            fields = ticket_fields_text(json.loads(custom_data or "{}"))
+        except (ValueError, AttributeError):
+            continue
+        entries.append((ticket_id * len(SEARCH_KINDS) + SEARCH_KINDS["fields"], fields, f"g{guild_id}", "fields", ticket_id))
+    c.execute("BEGIN")
+    try:
+        c.executemany("INSERT INTO ticket_search (rowid, content, guild, kind, ticket_id) VALUES (?, ?, ?, ?, ?)", entries)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return rows[-1][0]
+
+async def backfill_search_index():
+    after_id = 0
+    try:
+        # Small batches with a pause in between, like archiving, so the backfill never stalls the bot
+        while (after_id := index_missing_fields(after_id, ARCHIVE_BATCH_SIZE)) is not None:
+            await asyncio.sleep(0.1)
+    except sqlite3.Error as e:
+        print(f"Error backfilling the search index: {e}")
+
+def read_ticket_search(ticket_id: int) -> Dict[str, str]:
+    c.execute("SELECT kind, content FROM ticket_search WHERE rowid BETWEEN ? AND ?",
+              (ticket_id * len(SEARCH_KINDS), ticket_id * len(SEARCH_KINDS) + len(SEARCH_KINDS) - 1))
+    return dict(c.fetchall())
+
+# Moves a ticket's search entries between the hot index and the archive index. Entries are
+# removed from the contentless archive index by replaying the exact text that was indexed.
+def move_search_rows(ticket_id: int, guild_id: int, search: Dict[str, Optional[str]], to_archive: bool):
+    for kind, code in SEARCH_KINDS.items():
+        if search.get(kind) is None:
+            continue
+        rowid = ticket_id * len(SEARCH_KINDS) + code
+        if to_archive:
+            c.execute("INSERT INTO archive.archived_search (rowid, content, guild) VALUES (?, ?, ?)",
+                      (rowid, search[kind], f"g{guild_id}"))
+            c.execute("DELETE FROM ticket_search WHERE rowid = ?", (rowid,))
+        else:
+            c.execute('''
+            INSERT INTO archive.archived_search (archived_search, rowid, content, guild) VALUES ('delete', ?, ?, ?)
+            ''', (rowid, search[kind], f"g{guild_id}"))
+            c.execute("DELETE FROM ticket_search WHERE rowid = ?", (rowid,))
+            c.execute("INSERT INTO ticket_search (rowid, content, guild, kind, ticket_id) VALUES (?, ?, ?, ?, ?)",
+                      (rowid, search[kind], f"g{guild_id}", kind, ticket_id))
+
+# Archival of old closed tickets
+ARCHIVE_COLUMNS = ("id", "user_id", "channel_id", "status", "created_at", "ticket_type", "assigned_to",
+                   "priority", "custom_data", "guild_id", "panel_id", "preset_id", "closed_at")
+
+def archive_batch(cutoff: str, limit: int) -> int:
+    # The newest row is never archived so SQLite can't hand its id out again
+    c.execute(f'''
+    SELECT {", ".join(ARCHIVE_COLUMNS)} FROM tickets
+    WHERE status = 'closed' AND closed_at < ? AND id < (SELECT MAX(id) FROM tickets)
+    LIMIT ?
+    ''', (cutoff, limit))
+    rows = [dict(zip(ARCHIVE_COLUMNS, row)) for row in c.fetchall()]
+    if not rows:
+        return 0
+    
+    # Compress outside the write transaction so the writer lock is only held for the copy
+    archived_at = datetime.datetime.now().isoformat()
+    records = []
+    searches = []
+    for ticket in rows:
+        search = read_ticket_search(ticket["id"])
+        if "fields" not in search and ticket["custom_data"]:
+            # Not reached by the search backfill yet
+            search["fields"] = ticket_fields_text(json.loads(ticket["custom_data"]))
+        searches.append(search)
+        payload = zlib.compress(json.dumps({
+            "ticket": ticket,
+            "transcript": search.get("transcript"),
+            "fields": search.get("fields")
+        }).encode("utf-8"))
+        records.append((
+            ticket["id"], ticket["guild_id"], ticket["user_id"], ticket["channel_id"], ticket["status"],
+            ticket["priority"], ticket["preset_id"], ticket["created_at"], ticket["closed_at"], archived_at, payload
+        ))
+    
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.executemany('''
+        INSERT OR REPLACE INTO archive.archived_tickets
+        (id, guild_id, user_id, channel_id, status, priority, preset_id, created_at, closed_at, archived_at, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', records)
+        c.executemany("DELETE FROM tickets WHERE id = ?", [(ticket["id"],) for ticket in rows])
+        for ticket, search in zip(rows, searches):
+            move_search_rows(ticket["id"], ticket["guild_id"], search, to_archive=True)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    for ticket in rows:
+        ticket_states.pop(ticket["channel_id"], None)
+    return len(rows)
+
+def restore_archived_ticket(guild_id: int, ticket_id: int) -> Optional[dict]:
+    c.execute("SELECT payload FROM archive.archived_tickets WHERE id = ? AND guild_id = ?", (ticket_id, guild_id))
+    result = c.fetchone()
+    if not result:
+        return None
+    
+    archived = json.loads(zlib.decompress(result[0]).decode("utf-8"))
+    # Restored tickets count as closed from now on, so they don't age straight back out
+    ticket = dict(archived["ticket"], closed_at=datetime.datetime.now().isoformat())
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute(f'''
+        INSERT INTO tickets ({", ".join(ARCHIVE_COLUMNS)})
+        VALUES ({", ".join("?" * len(ARCHIVE_COLUMNS))})
+        ''', tuple(ticket.get(column) for column in ARCHIVE_COLUMNS))
+        c.execute("DELETE FROM archive.archived_tickets WHERE id = ?", (ticket_id,))
+        # Payloads without "fields" predate the archive index; their entries are still hot
+        if "fields" in archived:
+            move_search_rows(ticket_id, guild_id, archived, to_archive=False)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return archived
+
+# Tickets archived before the archive had its own search index still have their entries in
+# the hot index; move them over once, recording the indexed text in each payload
+def move_legacy_search_batch(after_id: int, limit: int) -> Optional[int]:
+    c.execute("SELECT id, guild_id FROM archive.archived_tickets WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+    rows = c.fetchall()
+    if not rows:
+        return None
+    
+    updates = []
+    for ticket_id, guild_id in rows:
+        search = read_ticket_search(ticket_id)
+        if not search:
+            continue
+        c.execute("SELECT payload FROM archive.archived_tickets WHERE id = ?", (ticket_id,))
+        archived = json.loads(zlib.decompress(c.fetchone()[0]).decode("utf-8"))
+        archived["transcript"] = search.get("transcript")
+        archived["fields"] = search.get("fields")
+        updates.append((ticket_id, guild_id, search, zlib.compress(json.dumps(archived).encode("utf-8"))))
+    
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        for ticket_id, guild_id, search, payload in updates:
+            c.execute("UPDATE archive.archived_tickets SET payload = ? WHERE id = ?", (payload, ticket_id))
+            move_search_rows(ticket_id, guild_id, search, to_archive=True)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return rows[-1][0]
+
+async def archive_loop():
+    await bot.wait_until_ready()
+    try:
+        c.execute("PRAGMA archive.user_version")
+        if c.fetchone()[0] < 1:
+            after_id = 0
+            while (after_id := move_legacy_search_batch(after_id, ARCHIVE_BATCH_SIZE)) is not None:
+                await asyncio.sleep(1)
+            c.execute("PRAGMA archive.user_version = 1")
+    except sqlite3.Error as e:
+        print(f"Error moving archived search entries: {e}")
+    
+    while not bot.is_closed():
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)).isoformat()
+        try:
+            # Small batches with a pause in between keep the bot responsive during a backlog
+            while archive_batch(cutoff, ARCHIVE_BATCH_SIZE) == ARCHIVE_BATCH_SIZE:
+                await asyncio.sleep(1)
+        except sqlite3.Error as e:
+            print(f"Error archiving tickets: {e}")
+        await asyncio.sleep(3600)
+
+def build_search_query(guild_id: int, text: str) -> Optional[str]:
+    # Quote every term so user input can never be parsed as FTS syntax; a trailing * keeps prefix search
+    terms = re.findall(r"\w+\*?", text)
+    if not terms:
+        return None
+    phrases = " ".join(f'"{term[:-1]}"*' if term.endswith("*") else f'"{term}"' for term in terms)
+    return f'guild : "g{guild_id}" AND content : ({phrases})'
+
+def build_snippet(text: str, query: str, width: int = 120) -> str:
+    terms = [term.rstrip("*") for term in re.findall(r"\w+\*?", query)]
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    found = pattern.search(text)
+    if not found:
+        return ""
+    start = max(found.start() - width // 3, 0)
+    excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", text[start:start + width])
+    return f"{'…' if start else ''}{excerpt}{'…' if start + width < len(text) else ''}"
+
 async def get_ticket_category(guild: discord.Guild) -> discord.CategoryChannel:
     c.execute("SELECT category_id FROM guild_config WHERE guild_id=?", (guild.id,))
     result = c.fetchone()
@@ -147,51 +798,461 @@ async def get_ticket_category(guild: discord.Guild) -> discord.CategoryChannel:
     category = discord.utils.get(guild.categories, name=DEFAULT_CATEGORY_NAME)
     if not category:
         category = await guild.create_category(DEFAULT_CATEGORY_NAME)
-        c.execute("INSERT OR REPLACE INTO guild_config (guild_id, category_id) VALUES (?, ?)",
-                  (guild.id, category.id))
-        conn.commit()
+        set_guild_config(guild.id, "category_id", category.id)
     return category
 
-async def has_ticket_permission(interaction: discord.Interaction) -> bool:
-    if interaction.user.guild_permissions.administrator:
-        return True
-    
-    c.execute("SELECT ticket_role_id FROM guild_config WHERE guild_id=?", (interaction.guild.id,))
-    result = c.fetchone()
-    
-    if not result or not result[0]:
-        return False
+# Pool of ticket categories per guild: the primary category plus overflow categories.
+# Occupancy comes straight from the gateway cache plus in-flight reservations.
+class CategoryPool:
+    def __init__(self):
+        self._overflow: Dict[int, List[int]] = {}
+        self._reserved: Dict[int, int] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._uncached: Dict[int, int] = {}
+    
+    def overflow_ids(self, guild_id: int) -> List[int]:
+        if guild_id not in self._overflow:
+            c.execute("SELECT category_id FROM ticket_categories WHERE guild_id = ? ORDER BY position", (guild_id,))
+            self._overflow[guild_id] = [row[0] for row in c.fetchall()]
+        return self._overflow[guild_id]
+    
+    def occupancy(self, category: discord.CategoryChannel) -> int:
+        return len(category.channels) + self._reserved.get(category.id, 0)
+    
+    def categories(self, guild: discord.Guild, primary: discord.CategoryChannel) -> List[discord.CategoryChannel]:
+        pool = [primary]
+        for category_id in self.overflow_ids(guild.id):
+            category = guild.get_channel(category_id)
+            if category and category.id != primary.id:
+                pool.append(category)
+        return pool
+    
+    def free_slots(self, pool: List[discord.CategoryChannel]) -> int:
+        return sum(max(CATEGORY_CHANNEL_LIMIT - self.occupancy(category), 0) for category in pool)
+    
+    @contextlib.asynccontextmanager
+    async def reserve(self, guild: discord.Guild):
+        primary = await get_ticket_category(guild)
+        pool = self.categories(guild, primary)
+        category = min(pool, key=self.occupancy)
+        if self.occupancy(category) >= CATEGORY_CHANNEL_LIMIT:
+            category = await self._grow(guild, primary) or category
+            pool = self.categories(guild, primary)
+        
+        self._reserved[category.id] = self._reserved.get(category.id, 0) + 1
+        if self.free_slots(pool) < CATEGORY_HEADROOM and not self._lock(guild.id).locked():
+            task = asyncio.create_task(self._grow(guild, primary))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            yield category
+        finally:
+            self._release(category.id)
+    
+    def _release(self, category_id: int):
+        self._reserved[category_id] -= 1
+        if not self._reserved[category_id]:
+            del self._reserved[category_id]
+    
+    def hold_until_cached(self, category: discord.CategoryChannel, channel: discord.abc.GuildChannel):
+        # A new channel only shows up in category.channels once the gateway reports it, so
+        # its slot stays reserved until then (or until the timeout, if the event is lost)
+        if any(other.id == channel.id for other in category.channels):
+            return
+        self._reserved[category.id] = self._reserved.get(category.id, 0) + 1
+        self._uncached[channel.id] = category.id
+        asyncio.get_running_loop().call_later(CHANNEL_CACHE_TIMEOUT, self.cached, channel.id)
+    
+    def cached(self, channel_id: int):
+        category_id = self._uncached.pop(channel_id, None)
+        if category_id is not None:
+            self._release(category_id)
+    
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(guild_id, asyncio.Lock())
+    
+    async def _grow(self, guild: discord.Guild, primary: discord.CategoryChannel) -> Optional[discord.CategoryChannel]:
+        async with self._lock(guild.id):
+            pool = self.categories(guild, primary)
+            if self.free_slots(pool) >= CATEGORY_HEADROOM:
+                return min(pool, key=self.occupancy)
+            
+            overflow = self.overflow_ids(guild.id)
+            position = len(overflow) + 2
+            try:
+                category = await guild.create_category(
+                    f"{primary.name} {position}",
+                    overwrites=primary.overwrites,
+                    position=pool[-1].position + 1,
+                    reason="Ticket category overflow"
+                )
+            except discord.HTTPException as e:
+                print(f"Error creating overflow category in {guild.name}: {e}")
+                return None
+            
+            c.execute("INSERT INTO ticket_categories (guild_id, category_id, position) VALUES (?, ?, ?)",
+                      (guild.id, category.id, position))
+            conn.commit()
+            overflow.append(category.id)
+            return category
     
-    ticket_role = interaction.guild.get_role(result[0])
-    return ticket_role in interaction.user.roles if ticket_role else False
+    async def reclaim(self, guild: discord.Guild, category_id: int):
+        overflow = self.overflow_ids(guild.id)
+        if category_id not in overflow:
+            return
+        
+        category = guild.get_channel(category_id)
+        if category and (category.channels or self._reserved.get(category_id)):
+            return
+        if category:
+            # Keep the category while the rest of the pool is close to full
+            primary = await get_ticket_category(guild)
+            rest = [other for other in self.categories(guild, primary) if other.id != category_id]
+            if self.free_slots(rest) < 2 * CATEGORY_HEADROOM:
+                return
+            try:
+                await category.delete(reason="Ticket category overflow no longer needed")
+            except discord.HTTPException as e:
+                print(f"Error removing overflow category in {guild.name}: {e}")
+                return
+        
+        c.execute("DELETE FROM ticket_categories WHERE guild_id = ? AND category_id = ?", (guild.id, category_id))
+        conn.commit()
+        if category_id in overflow:
+            overflow.remove(category_id)
 
-async def get_allowed_roles(panel_id: Optional[int] = None, preset_id: Optional[int] = None) -> List[int]:
-    if panel_id:
-        c.execute("SELECT allowed_roles FROM custom_panels WHERE panel_id=?", (panel_id,))
-    elif preset_id:
-        c.execute("SELECT allowed_roles FROM ticket_presets WHERE preset_id=?", (preset_id,))
-    else:
-        return []
-    
-    result = c.fetchone()
-    if not result or not result[0]:
-        return []
-    
-    try:
-        return json.loads(result[0])
-    except (json.JSONDecodeError, TypeError):
-        return []
+category_pool = CategoryPool()
+
+# Compiled access policies for panels and presets. A policy is the frozenset of roles
+# allowed to use it, falling back to the guild's ticket role; decisions are memoized per
+# member role set and dropped whenever roles, presets or the ticket role change. Checks use
+# the member from the interaction itself, so a member's own role changes need no hook.
+class PermissionPolicies:
+    def __init__(self):
+        self._policies: Dict[int, Dict[Tuple[str, int], FrozenSet[int]]] = {}
+        self._decisions: Dict[int, Dict[Tuple[Tuple[str, int], FrozenSet[int]], bool]] = {}
+    
+    def _load_roles(self, guild_id: int, kind: str, object_id: int) -> FrozenSet[int]:
+        if kind == "guild":
+            c.execute("SELECT ticket_role_id FROM guild_config WHERE guild_id=?", (guild_id,))
+            result = c.fetchone()
+            return frozenset([result[0]]) if result and result[0] else frozenset()
+        
+        if kind == "panel":
+            c.execute("SELECT allowed_roles FROM custom_panels WHERE panel_id=?", (object_id,))
+        else:
+            c.execute("SELECT allowed_roles FROM ticket_presets WHERE preset_id=?", (object_id,))
+        result = c.fetchone()
+        if not result or not result[0]:
+            return frozenset()
+        try:
+            return frozenset(json.loads(result[0]))
+        except (json.JSONDecodeError, TypeError):
+            return frozenset()
+    
+    def allowed_roles(self, guild_id: int, panel_id: Optional[int] = None,
+                      preset_id: Optional[int] = None) -> FrozenSet[int]:
+        policies = self._policies.setdefault(guild_id, {})
+        if panel_id:
+            key = ("panel", panel_id)
+        elif preset_id:
+            key = ("preset", preset_id)
+        else:
+            key = ("guild", 0)
+        
+        if key not in policies:
+            policies[key] = self._load_roles(guild_id, *key)
+        if not policies[key] and key[0] != "guild":
+            return self.allowed_roles(guild_id)
+        return policies[key]
+    
+    def check(self, member: discord.Member, panel_id: Optional[int] = None, preset_id: Optional[int] = None) -> bool:
+        if member.id == member.guild.owner_id:
+            return True
+        
+        role_ids = frozenset(role.id for role in member.roles)
+        decisions = self._decisions.setdefault(member.guild.id, {})
+        memo_key = (("panel", panel_id) if panel_id else ("preset", preset_id or 0), role_ids)
+        decision = decisions.get(memo_key)
+        if decision is None:
+            # Administrator comes from the role set too, so it is safe to memoize with it
+            decision = (member.guild_permissions.administrator
+                        or not role_ids.isdisjoint(self.allowed_roles(member.guild.id, panel_id, preset_id)))
+            if len(decisions) > 10000:
+                decisions.clear()
+            decisions[memo_key] = decision
+        return decision
+    
+    def invalidate(self, guild_id: int, decisions_only: bool = False):
+        self._decisions.pop(guild_id, None)
+        if not decisions_only:
+            self._policies.pop(guild_id, None)
+
+permission_policies = PermissionPolicies()
+
+# Per-guild sorted list of preset names for prefix lookups, loaded on first use
+class PresetIndex:
+    def __init__(self):
+        self._names: Dict[int, List[str]] = {}
+        self._ids: Dict[int, Dict[str, int]] = {}
+    
+    def _load(self, guild_id: int):
+        if guild_id not in self._names:
+            c.execute("SELECT name, preset_id FROM ticket_presets WHERE guild_id = ? ORDER BY name", (guild_id,))
+            self._ids[guild_id] = dict(c.fetchall())
+            self._names[guild_id] = sorted(self._ids[guild_id])
+    
+    def add(self, guild_id: int, name: str, preset_id: int):
+        if guild_id not in self._names:
+            return  # picked up when the guild is first loaded
+        if name not in self._ids[guild_id]:
+            bisect.insort(self._names[guild_id], name)
+        self._ids[guild_id][name] = preset_id
+    
+    def lookup(self, guild_id: int, name: str) -> Optional[int]:
+        self._load(guild_id)
+        return self._ids[guild_id].get(name)
+    
+    def search(self, guild_id: int, prefix: str):
+        self._load(guild_id)
+        names, ids = self._names[guild_id], self._ids[guild_id]
+        for index in range(bisect.bisect_left(names, prefix), len(names)):
+            if not names[index].startswith(prefix):
+                break
+            yield names[index], ids[names[index]]
+
+preset_index = PresetIndex()
 
 async def check_panel_permission(interaction: discord.Interaction, panel_id: Optional[int] = None, preset_id: Optional[int] = None) -> bool:
-    if interaction.user.guild_permissions.administrator:
+    return permission_policies.check(interaction.user, panel_id, preset_id)
+
+# Per-channel cache of the ticket row fields the button and close handlers need,
+# so those paths cost at most one indexed lookup per channel
+class TicketState:
+    __slots__ = ("ticket_id", "user_id", "status", "priority", "assigned_to",
+                 "control_message_id", "panel_id", "preset_id")
+    
+    def __init__(self, ticket_id: int, user_id: int, status: str, priority: str, assigned_to: Optional[int],
+                 control_message_id: Optional[int], panel_id: Optional[int], preset_id: Optional[int]):
+        self.ticket_id = ticket_id
+        self.user_id = user_id
+        self.status = status
+        self.priority = priority
+        self.assigned_to = assigned_to
+        self.control_message_id = control_message_id
+        self.panel_id = panel_id
+        self.preset_id = preset_id
+
+ticket_states: Dict[int, TicketState] = {}
+
+def get_ticket_state(channel_id: int) -> Optional[TicketState]:
+    state = ticket_states.get(channel_id)
+    if state is None:
+        c.execute('''
+        SELECT id, user_id, status, priority, assigned_to, control_message_id, panel_id, preset_id
+        FROM tickets WHERE channel_id = ?
+        ''', (channel_id,))
+        row = c.fetchone()
+        if not row:
+            return None
+        state = ticket_states[channel_id] = TicketState(*row)
+    return state
+
+def set_ticket_priority(channel_id: int, priority: str):
+    c.execute("UPDATE tickets SET priority = ? WHERE channel_id = ?", (priority, channel_id))
+    conn.commit()
+    state = ticket_states.get(channel_id)
+    if state:
+        state.priority = priority
+
+def mark_ticket_closed(channel_id: int):
+    c.execute("UPDATE tickets SET status = ?, closed_at = ? WHERE channel_id = ?",
+              ("closed", datetime.datetime.now().isoformat(), channel_id))
+    conn.commit()
+    state = ticket_states.get(channel_id)
+    if state:
+        state.status = "closed"
+    scheduler.stop(channel_id)
+
+async def remove_control_view(channel: discord.TextChannel, state: TicketState):
+    try:
+        if state.control_message_id:
+            await channel.get_partial_message(state.control_message_id).edit(view=None)
+        else:
+            # Tickets created before control messages were recorded
+            pins = await channel.pins()
+            if pins:
+                await pins[0].edit(view=None)
+    except discord.NotFound:
+        pass
+
+# Idle-ticket scheduler: one min-heap of deadlines and one sleeping task per process.
+# Cancelled or rescheduled entries are left in the heap and skipped when popped.
+class TicketScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._deadlines: Dict[Tuple[int, str], float] = {}
+        self._active: Set[int] = set()
+        self._dirty: Dict[Tuple[int, str], Optional[float]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._firing: Set[asyncio.Task] = set()
+    
+    def load(self):
+        # Kinds disabled since they were scheduled are dropped rather than fired
+        kinds = list(IDLE_TIMERS)
+        c.execute(f"DELETE FROM ticket_timers WHERE kind NOT IN ({','.join('?' * len(kinds))})", kinds)
+        c.execute("SELECT channel_id, kind, due_at FROM ticket_timers")
+        for channel_id, kind, due_at in c.fetchall():
+            self._deadlines[(channel_id, kind)] = due_at
+            self._active.add(channel_id)
+            self._heap.append((due_at, channel_id, kind))
+        heapq.heapify(self._heap)
+    
+    def seed(self):
+        # Tickets opened before idle timers existed get a full set, counted from now, once
+        c.execute("PRAGMA user_version")
+        if c.fetchone()[0] >= 1 or not IDLE_TIMERS:
+            return
+        c.execute('''
+        SELECT channel_id FROM tickets
+        WHERE status IN ('open', 'claimed') AND channel_id NOT IN (SELECT channel_id FROM ticket_timers)
+        ''')
+        for (channel_id,) in c.fetchall():
+            self.start(channel_id)
+        self.flush()
+        c.execute("PRAGMA user_version = 1")
+    
+    def start_loop(self):
+        if self._task is None:
+            self.load()
+            self.seed()
+            self._task = asyncio.create_task(self._run())
+    
+    def _schedule(self, channel_id: int, kind: str, due_at: float):
+        key = (channel_id, kind)
+        self._deadlines[key] = due_at
+        self._dirty[key] = due_at
+        entry = (due_at, channel_id, kind)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] == entry:
+            self._wakeup.set()
+        
+        # Drop stale entries once they dominate the heap
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(due, cid, k) for (cid, k), due in self._deadlines.items()]
+            heapq.heapify(self._heap)
+    
+    def start(self, channel_id: int):
+        self._active.add(channel_id)
+        now = time.time()
+        for kind, delay in IDLE_TIMERS.items():
+            self._schedule(channel_id, kind, now + delay)
+    
+    def touch(self, channel_id: int):
+        if channel_id not in self._active:
+            return
+        now = time.time()
+        for kind, delay in IDLE_TIMERS.items():
+            if now + delay - self._deadlines.get((channel_id, kind), 0) >= TIMER_TOUCH_GRANULARITY:
+                self._schedule(channel_id, kind, now + delay)
+    
+    def forget(self, channel_id: int) -> bool:
+        # In-memory half of stop(), for callers that delete the rows in their own batch
+        if channel_id not in self._active:
+            return False
+        self._active.discard(channel_id)
+        for kind in IDLE_TIMERS:
+            self._deadlines.pop((channel_id, kind), None)
+            self._dirty.pop((channel_id, kind), None)
         return True
     
-    allowed_roles = await get_allowed_roles(panel_id, preset_id)
-    if not allowed_roles:
-        return await has_ticket_permission(interaction)
+    def stop(self, channel_id: int):
+        if self.forget(channel_id):
+            c.execute("DELETE FROM ticket_timers WHERE channel_id = ?", (channel_id,))
+            conn.commit()
+    
+    def flush(self):
+        if not self._dirty:
+            return
+        upserts = [(cid, kind, due) for (cid, kind), due in self._dirty.items() if due is not None]
+        deletes = [(cid, kind) for (cid, kind), due in self._dirty.items() if due is None]
+        self._dirty.clear()
+        c.execute("BEGIN")
+        try:
+            c.executemany("INSERT OR REPLACE INTO ticket_timers (channel_id, kind, due_at) VALUES (?, ?, ?)", upserts)
+            c.executemany("DELETE FROM ticket_timers WHERE channel_id = ? AND kind = ?", deletes)
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+    
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due_at, channel_id, kind = heapq.heappop(self._heap)
+                if self._deadlines.get((channel_id, kind)) != due_at:
+                    continue  # cancelled or rescheduled
+                del self._deadlines[(channel_id, kind)]
+                self._dirty[(channel_id, kind)] = None
+                task = asyncio.create_task(self._fire(channel_id, kind))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+            
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error saving ticket timers: {e}")
+            
+            timeout = TIMER_FLUSH_INTERVAL
+            if self._heap:
+                timeout = min(timeout, max(self._heap[0][0] - time.time(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
-    user_roles = [role.id for role in interaction.user.roles]
-    return any(role_id in user_roles for role_id in allowed_roles)
+    async def _fire(self, channel_id: int, kind: str):
+        channel = bot.get_channel(channel_id)
+        state = get_ticket_state(channel_id)
+        if not channel or not state or state.status == "closed":
+            self.stop(channel_id)
+            return
+        
+        assigned_to, priority = state.assigned_to, state.priority
+        idle_hours = round(IDLE_TIMERS[kind] / 3600)
+        try:
+            if kind == "remind":
+                assignee = f"<@&{assigned_to}>" if assigned_to == SUPPORT_ROLE_ID else f"<@{assigned_to}>"
+                await channel.send(f"⏰ {assignee} this ticket has had no activity for {idle_hours} hours.")
+            elif kind == "escalate":
+                levels = list(PRIORITIES.values())
+                current = levels.index(priority) if priority in levels else 1
+                if current < len(levels) - 1:
+                    new_priority = levels[current + 1]
+                    set_ticket_priority(channel_id, new_priority)
+                    await channel.send(f"⚠️ Priority escalated to **{new_priority}** after {idle_hours} hours of inactivity.")
+                    await log_action(channel.guild.id, f"Priority of ticket in {channel.mention} escalated to {new_priority}")
+            elif kind == "autoclose":
+                await auto_close_ticket(channel, state, idle_hours)
+        except discord.HTTPException as e:
+            print(f"Error running {kind} timer for channel {channel_id}: {e}")
+
+scheduler = TicketScheduler()
+
+async def auto_close_ticket(channel: discord.TextChannel, state: TicketState, idle_hours: int):
+    mark_ticket_closed(channel.id)
+    await remove_control_view(channel, state)
+    
+    view = ClosedTicketView(channel, state.user_id)
+    await channel.send(
+        f"🔒 Ticket closed automatically after {idle_hours} hours of inactivity. Please choose an action:",
+        view=view
+    )
+    await log_action(channel.guild.id, f"Ticket #{channel.name} closed automatically after {idle_hours} hours of inactivity")
 
 # Modal for custom ticket creation
 class AdvancedTicketModal(ui.Modal, title="Create Custom Ticket"):
@@ -268,15 +1329,96 @@ class AdvancedTicketModal(ui.Modal, title="Create Custom Ticket"):
                 custom_data["fields"][child.label] = child.value
         
         # Create the ticket
-        await create_advanced_ticket(interaction, custom_data, self.panel_id, self.preset_id)
+        await submit_ticket(interaction, custom_data, self.panel_id, self.preset_id)
+
+# Per-guild token bucket limiting how fast ticket channels are created. Requests over
+# budget wait in FIFO order instead of failing.
+class AdmissionGate:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def try_acquire(self) -> bool:
+        if self.waiting:
+            return False  # don't jump the queue
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+    
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                while self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+admission_gates: Dict[int, AdmissionGate] = {}
+pending_tickets: Dict[Tuple[int, int], Optional[int]] = {}
+
+def find_open_ticket(guild_id: int, user_id: int, panel_id: Optional[int], preset_id: Optional[int]) -> Optional[int]:
+    c.execute("SELECT one_ticket_per_user FROM guild_config WHERE guild_id = ?", (guild_id,))
+    result = c.fetchone()
+    if not result or not result[0]:
+        return None
+    
+    c.execute('''
+    SELECT channel_id FROM tickets
+    WHERE guild_id = ? AND user_id = ? AND status != 'closed' AND panel_id IS ? AND preset_id IS ?
+    LIMIT 1
+    ''', (guild_id, user_id, panel_id, preset_id))
+    result = c.fetchone()
+    return result[0] if result else None
 
-async def create_advanced_ticket(interaction: discord.Interaction, custom_data: dict, 
-                               panel_id: Optional[int] = None, preset_id: Optional[int] = None):
-    guild = interaction.guild
-    category = await get_ticket_category(guild)
-    ticket_number = get_next_ticket_number(guild.id)
+async def submit_ticket(interaction: discord.Interaction, custom_data: dict,
+                        panel_id: Optional[int] = None, preset_id: Optional[int] = None):
+    # Double clicks and resubmits while a ticket is being created join the first request
+    key = (interaction.guild.id, interaction.user.id)
+    if key in pending_tickets:
+        await interaction.followup.send("⏳ Your ticket is already being created - it will be ready in a moment.",
+                                        ephemeral=True)
+        return
+    
+    existing = find_open_ticket(interaction.guild.id, interaction.user.id, panel_id, preset_id)
+    if existing:
+        await send_popup(
+            interaction,
+            "❌ Ticket Already Open",
+            f"You already have an open ticket of this type: <#{existing}>",
+            is_error=True
+        )
+        return
     
-    # Determine channel name
+    # Hold the slot while the job is recorded so concurrent submits see it
+    pending_tickets[key] = None
+    try:
+        await provisioning.submit(interaction, custom_data, panel_id, preset_id)
+    except Exception:
+        pending_tickets.pop(key, None)
+        raise
+
+def get_admission_gate(guild_id: int) -> AdmissionGate:
+    gate = admission_gates.get(guild_id)
+    if gate is None:
+        gate = admission_gates[guild_id] = AdmissionGate(TICKET_CREATE_RATE / 60, TICKET_CREATE_BURST)
+    return gate
+
+def build_ticket_channel_name(ticket_number: int, panel_id: Optional[int], preset_id: Optional[int]) -> str:
     if preset_id:
         c.execute("SELECT name FROM ticket_presets WHERE preset_id=?", (preset_id,))
         preset_name = c.fetchone()[0]
@@ -287,29 +1429,10 @@ async def create_advanced_ticket(interaction: discord.Interaction, custom_data:
         channel_name = f"{panel_title.lower().replace(' ', '-')}-{ticket_number}"
     else:
         channel_name = f"ticket-{ticket_number}"
-    
-    channel_name = channel_name[:99]  # Discord channel name limit
-    try:
-        channel = await category.create_text_channel(channel_name)
-    except discord.Forbidden:
-        await send_popup(
-            interaction,
-            "❌ Permission Error",
-            "Bot doesn't have permission to create channels!",
-            is_error=True
-        )
-        return
-    
-    # Set permissions
-    await channel.set_permissions(interaction.user, read_messages=True, send_messages=True)
-    await channel.set_permissions(guild.default_role, read_messages=False)
-    
-    if SUPPORT_ROLE_ID:
-        support_role = guild.get_role(SUPPORT_ROLE_ID)
-        if support_role:
-            await channel.set_permissions(support_role, read_messages=True, send_messages=True)
-    
-    # Create embed
+    return channel_name[:99]  # Discord channel name limit
+
+def build_ticket_embed(guild: discord.Guild, member: discord.Member, ticket_number: int, custom_data: dict,
+                       panel_id: Optional[int], preset_id: Optional[int]) -> discord.Embed:
     embed_color = discord.Color.green()
     color_hex = None
     
@@ -332,70 +1455,285 @@ async def create_advanced_ticket(interaction: discord.Interaction, custom_data:
         timestamp=datetime.datetime.now()
     )
     
-    embed.add_field(name="Created by", value=interaction.user.mention, inline=False)
+    embed.add_field(name="Created by", value=member.mention, inline=False)
     
     for field_name, field_value in custom_data["fields"].items():
         if field_value:  # Only add non-empty fields
             embed.add_field(name=field_name, value=field_value[:1024], inline=False)
     
-    # Mark ticket as claimed automatically
-    assigned_to = SUPPORT_ROLE_ID if SUPPORT_ROLE_ID else interaction.user.id
-    c.execute("UPDATE tickets SET status = 'claimed', assigned_to = ? WHERE channel_id = ?",
-              (assigned_to, channel.id))
-    conn.commit()
-    
+    # Tickets are claimed automatically
     embed.add_field(name="Status", value="🟡 Claimed", inline=False)
     if SUPPORT_ROLE_ID:
         support_role = guild.get_role(SUPPORT_ROLE_ID)
         if support_role:
             embed.add_field(name="Assigned To", value=support_role.mention, inline=False)
+    return embed
+
+# Durable ticket provisioning. Each submit is stored as a job and acknowledged right away;
+# the job's steps then run in the background with a checkpoint after each one, so a job
+# interrupted by a crash or restart resumes where it stopped instead of leaving an orphan.
+JOB_STEPS = ("channel", "message", "record", "finalize")
+JOB_STEP_LABELS = {
+    "channel": "Creating your ticket channel",
+    "message": "Posting your ticket details",
+    "record": "Saving your ticket",
+    "finalize": "Finishing up"
+}
+JOB_MAX_ATTEMPTS = 3
+PROVISIONING_WORKERS = 4
+
+class ProvisioningError(Exception):
+    pass
+
+def job_channel_marker(job_id: int) -> str:
+    return f"(ticket job {job_id})"
+
+class ProvisioningPipeline:
+    def __init__(self, workers: int):
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._started = False
+    
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        # Failed jobs left behind by a crash mid-cleanup still hold interaction tokens
+        c.execute("DELETE FROM ticket_jobs WHERE status = 'failed'")
+        conn.commit()
+        c.execute("SELECT job_id, guild_id, user_id FROM ticket_jobs WHERE status IN ('pending', 'running') ORDER BY job_id")
+        for job_id, guild_id, user_id in c.fetchall():
+            pending_tickets[(guild_id, user_id)] = job_id
+            self.enqueue(job_id)
+    
+    async def submit(self, interaction: discord.Interaction, custom_data: dict,
+                     panel_id: Optional[int], preset_id: Optional[int]) -> int:
+        ticket_number = reserve_ticket_number(interaction.guild.id)
+        c.execute('''
+        INSERT INTO ticket_jobs (guild_id, user_id, panel_id, preset_id, custom_data, interaction_token, ticket_number)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (interaction.guild.id, interaction.user.id, panel_id, preset_id, json.dumps(custom_data),
+              interaction.token, ticket_number))
+        conn.commit()
+        job_id = c.lastrowid
+        pending_tickets[(interaction.guild.id, interaction.user.id)] = job_id
+        
+        try:
+            message = await interaction.followup.send("⏳ Your ticket request was received and is being set up...",
+                                                      ephemeral=True, wait=True)
+        except Exception:
+            # A request the user never saw acknowledged must not come back on the next restart
+            c.execute("DELETE FROM ticket_jobs WHERE job_id = ?", (job_id,))
+            conn.commit()
+            raise
+        self._checkpoint(job_id, followup_id=message.id)
+        self.enqueue(job_id)
+        return job_id
+    
+    def enqueue(self, job_id: int):
+        if job_id not in self._tasks:
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+    
+    def _load(self, job_id: int) -> dict:
+        c.execute("SELECT * FROM ticket_jobs WHERE job_id = ?", (job_id,))
+        row = c.fetchone()
+        job = dict(zip([column[0] for column in c.description], row))
+        job["custom_data"] = json.loads(job["custom_data"])
+        job["resumed"] = job["status"] == "running"
+        return job
+    
+    def _checkpoint(self, job_id: int, **values):
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        c.execute(f"UPDATE ticket_jobs SET {assignments} WHERE job_id = ?", (*values.values(), job_id))
+        conn.commit()
     
-    # Create view with management buttons (without claim button)
-    view = TicketManagementView()
+    async def _progress(self, job: dict, content: str):
+        if not job["interaction_token"] or not job["followup_id"]:
+            return
+        # Rebuilt from the stored token so progress also reaches users after a restart
+        webhook = discord.Webhook.partial(APPLICATION_ID, job["interaction_token"], client=bot)
+        try:
+            await webhook.edit_message(job["followup_id"], content=content)
+        except discord.HTTPException:
+            pass  # token expired or message dismissed
     
-    # Ping support role if available
-    ping_content = interaction.user.mention
-    if SUPPORT_ROLE_ID:
-        support_role = guild.get_role(SUPPORT_ROLE_ID)
-        if support_role:
-            ping_content += f" {support_role.mention}"
+    async def _run(self, job_id: int):
+        job = self._load(job_id)
+        guild = bot.get_guild(job["guild_id"])
+        try:
+            if not guild:
+                raise ProvisioningError("Bot is no longer in this server")
+            
+            if not job["channel_id"]:
+                gate = get_admission_gate(guild.id)
+                if not gate.try_acquire():
+                    await self._progress(job, f"⏳ Lots of tickets are being opened right now - you are "
+                                              f"#{gate.waiting + 1} in line. Your ticket will be created shortly.")
+                    await gate.acquire()
+            
+            async with self._slots:
+                self._checkpoint(job_id, status="running")
+                member = await member_cache.fetch(guild, job["user_id"])
+                for index in range(JOB_STEPS.index(job["step"]), len(JOB_STEPS)):
+                    job["step"] = JOB_STEPS[index]
+                    if job["step"] != "finalize":
+                        await self._progress(job, f"⏳ {JOB_STEP_LABELS[job['step']]}...")
+                    await self._attempt(job, guild, member)
+                    job["attempts"] = 0
+                    if index + 1 < len(JOB_STEPS):
+                        self._checkpoint(job_id, step=JOB_STEPS[index + 1], attempts=0,
+                                         ticket_number=job["ticket_number"], channel_id=job["channel_id"],
+                                         message_id=job["message_id"])
+            
+            c.execute("DELETE FROM ticket_jobs WHERE job_id = ?", (job_id,))
+            conn.commit()
+        except Exception as e:
+            await self._fail(job, guild, e)
+        finally:
+            self._tasks.pop(job_id, None)
+            pending_tickets.pop((job["guild_id"], job["user_id"]), None)
+    
+    async def _attempt(self, job: dict, guild: discord.Guild, member: discord.Member):
+        step_handler = getattr(self, f"_step_{job['step']}")
+        while True:
+            try:
+                return await step_handler(job, guild, member)
+            except (discord.Forbidden, discord.NotFound):
+                raise
+            except (discord.HTTPException, asyncio.TimeoutError, OSError):
+                job["attempts"] += 1
+                self._checkpoint(job["job_id"], attempts=job["attempts"])
+                if job["attempts"] >= JOB_MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(2 ** job["attempts"])
+    
+    async def _step_channel(self, job: dict, guild: discord.Guild, member: discord.Member):
+        if job["channel_id"] and guild.get_channel(job["channel_id"]):
+            return
+        
+        # The topic tags the channel with its job, so a channel created right before a crash,
+        # or by a request that errored after Discord had already applied it, is picked up
+        # again instead of being duplicated
+        marker = job_channel_marker(job["job_id"])
+        if job["resumed"] or job["attempts"]:
+            channel = discord.utils.find(lambda ch: (ch.topic or "").endswith(marker), guild.text_channels)
+            if channel:
+                job["channel_id"] = channel.id
+                return
+        
+        if not job["ticket_number"]:
+            job["ticket_number"] = reserve_ticket_number(guild.id)
+        channel_name = build_ticket_channel_name(job["ticket_number"], job["panel_id"], job["preset_id"])
+        
+        async with category_pool.reserve(guild) as category:
+            # Permissions are part of the create call so the channel is never visible to everyone
+            overwrites = dict(category.overwrites)
+            overwrites[guild.default_role] = discord.PermissionOverwrite(read_messages=False)
+            overwrites[member] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            if SUPPORT_ROLE_ID:
+                support_role = guild.get_role(SUPPORT_ROLE_ID)
+                if support_role:
+                    overwrites[support_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            
+            channel = await category.create_text_channel(
+                channel_name,
+                overwrites=overwrites,
+                topic=f"Ticket #{job['ticket_number']} opened by {member} {marker}"
+            )
+            category_pool.hold_until_cached(category, channel)
+        job["channel_id"] = channel.id
     
-    # Send the ticket message
-    try:
-        message = await channel.send(
-            content=ping_content,
-            embed=embed,
-            view=view
-        )
-        await message.pin()
-    except discord.Forbidden:
-        await send_popup(
-            interaction,
-            "❌ Permission Error",
-            "Bot doesn't have permission to send messages or pin!",
-            is_error=True
-        )
-        return
+    async def _step_message(self, job: dict, guild: discord.Guild, member: discord.Member):
+        channel = guild.get_channel(job["channel_id"])
+        if not channel:
+            raise ProvisioningError("Ticket channel was deleted while it was being set up")
+        
+        if not job["message_id"] and (job["resumed"] or job["attempts"]):
+            pins = await channel.pins()
+            message = discord.utils.find(lambda m: m.author.id == bot.user.id, pins)
+            if message:
+                job["message_id"] = message.id
+        
+        if not job["message_id"]:
+            embed = build_ticket_embed(guild, member, job["ticket_number"], job["custom_data"],
+                                       job["panel_id"], job["preset_id"])
+            
+            # Ping support role if available
+            ping_content = member.mention
+            if SUPPORT_ROLE_ID:
+                support_role = guild.get_role(SUPPORT_ROLE_ID)
+                if support_role:
+                    ping_content += f" {support_role.mention}"
+            
+            message = await channel.send(content=ping_content, embed=embed, view=TicketManagementView())
+            job["message_id"] = message.id
+            self._checkpoint(job["job_id"], message_id=message.id)
+        
+        # Pinning an already pinned message is a no-op, so retries are safe
+        await channel.get_partial_message(job["message_id"]).pin()
     
-    # Store in database
-    c.execute('''
-    INSERT INTO tickets 
-    (user_id, channel_id, status, created_at, ticket_type, priority, custom_data, guild_id)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        interaction.user.id,
-        channel.id,
-        "claimed",  # Automatically mark as claimed
-        datetime.datetime.now().isoformat(),
-        "preset" if preset_id else "custom",
-        "medium",
-        json.dumps(custom_data),
-        guild.id
-    ))
-    conn.commit()
+    async def _step_record(self, job: dict, guild: discord.Guild, member: discord.Member):
+        c.execute("SELECT id FROM tickets WHERE channel_id = ?", (job["channel_id"],))
+        if c.fetchone():
+            return
+        
+        # Inserted as claimed and assigned in one go
+        assigned_to = SUPPORT_ROLE_ID if SUPPORT_ROLE_ID else member.id
+        c.execute('''
+        INSERT INTO tickets 
+        (user_id, channel_id, status, created_at, ticket_type, assigned_to, priority, custom_data, guild_id,
+         panel_id, preset_id, control_message_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            member.id,
+            job["channel_id"],
+            "claimed",
+            datetime.datetime.now().isoformat(),
+            "preset" if job["preset_id"] else "custom",
+            assigned_to,
+            "medium",
+            json.dumps(job["custom_data"]),
+            guild.id,
+            job["panel_id"],
+            job["preset_id"],
+            job["message_id"]
+        ))
+        conn.commit()
+    
+    async def _step_finalize(self, job: dict, guild: discord.Guild, member: discord.Member):
+        state = get_ticket_state(job["channel_id"])
+        index_ticket_fields(state.ticket_id, guild.id, job["custom_data"])
+        scheduler.start(job["channel_id"])
+        member_cache.pin(job["channel_id"], member)
+        
+        await self._progress(job, f"🎫 Ticket created: <#{job['channel_id']}>")
+        await log_action(guild.id, f"Ticket #{job['ticket_number']} created by {member}")
     
-    await interaction.followup.send(f"🎫 Ticket created: {channel.mention}", ephemeral=True)
-    await log_action(guild.id, f"Ticket #{ticket_number} created by {interaction.user}")
+    async def _fail(self, job: dict, guild: Optional[discord.Guild], error: Exception):
+        print(f"Ticket job {job['job_id']} failed at step '{job['step']}': {error}")
+        self._checkpoint(job["job_id"], status="failed", error=str(error)[:500])
+        
+        # Without a ticket row the channel would be an orphan
+        if guild and job["channel_id"] and job["step"] != "finalize":
+            channel = guild.get_channel(job["channel_id"])
+            if channel:
+                try:
+                    await channel.delete(reason="Ticket setup failed")
+                except discord.HTTPException:
+                    pass
+        
+        if isinstance(error, discord.Forbidden):
+            reason = "Bot doesn't have permission to create or set up ticket channels!"
+        elif isinstance(error, ProvisioningError):
+            reason = str(error)
+        else:
+            reason = "Something went wrong while setting up your ticket. Please try again."
+        await self._progress(job, f"❌ {reason}")
+        
+        c.execute("DELETE FROM ticket_jobs WHERE job_id = ?", (job["job_id"],))
+        conn.commit()
+
+provisioning = ProvisioningPipeline(PROVISIONING_WORKERS)
 
 class PriorityView(ui.View):
     def __init__(self):
@@ -411,8 +1749,7 @@ class PriorityButton(ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         # Update priority in DB
-        c.execute("UPDATE tickets SET priority = ? WHERE channel_id = ?", (self.priority, interaction.channel.id))
-        conn.commit()
+        set_ticket_priority(interaction.channel.id, self.priority)
 
         await interaction.response.send_message(
             f"✅ Priority set to **{self.label}**.",
@@ -421,6 +1758,51 @@ class PriorityButton(ui.Button):
         await log_action(interaction.guild.id, f"Priority of ticket in {interaction.channel.mention} set to {self.label} by {interaction.user.mention}")
 
 
+# Modal for adding a user to a ticket
+class AddUserModal(ui.Modal, title="Add User to Ticket"):
+    user = ui.TextInput(
+        label="User",
+        placeholder="User ID or mention",
+        style=discord.TextStyle.short,
+        required=True
+    )
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            user_id = int(self.user.value.strip().strip("<@!>"))
+        except ValueError:
+            await send_popup(
+                interaction,
+                "❌ Invalid User",
+                "Please provide a valid user ID or mention!",
+                is_error=True
+            )
+            return
+        
+        try:
+            member = await member_cache.fetch(interaction.guild, user_id)
+            await interaction.channel.set_permissions(member, read_messages=True, send_messages=True)
+        except discord.NotFound:
+            await send_popup(
+                interaction,
+                "❌ User Not Found",
+                "That user is not a member of this server!",
+                is_error=True
+            )
+            return
+        except discord.Forbidden:
+            await send_popup(
+                interaction,
+                "❌ Permission Error",
+                "Bot doesn't have permission to edit this channel!",
+                is_error=True
+            )
+            return
+        
+        member_cache.pin(interaction.channel.id, member)
+        await send_popup(interaction, "✅ User Added", f"{member.mention} has been added to the ticket.")
+        await log_action(interaction.guild.id, f"{member} added to #{interaction.channel.name} by {interaction.user}")
+
 # Ticket management view (without claim button)
 class TicketManagementView(ui.View):
     def __init__(self):
@@ -437,22 +1819,22 @@ class TicketManagementView(ui.View):
     
     @ui.button(label="Close Ticket", style=discord.ButtonStyle.red, custom_id="ticket_close", emoji="🔒")
     async def close_ticket(self, interaction: discord.Interaction, button: ui.Button):
-        c.execute("UPDATE tickets SET status = ? WHERE channel_id = ?",
-                  ("closed", interaction.channel.id))
-        conn.commit()
+        state = get_ticket_state(interaction.channel.id)
+        if not state:
+            await send_popup(
+                interaction,
+                "❌ Invalid Channel",
+                "This is not a ticket channel!",
+                is_error=True
+            )
+            return
+        mark_ticket_closed(interaction.channel.id)
         
         # Remove the original ticket management view
-        pins = await interaction.channel.pins()
-        if pins:
-            ticket_message = pins[0]
-            await ticket_message.edit(view=None)
-        
-        # Get creator ID for transcript DM
-        c.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-        creator_id = c.fetchone()[0]
+        await remove_control_view(interaction.channel, state)
         
-        # Send closed ticket panel
-        view = ClosedTicketView(interaction.channel, creator_id)
+        # Send closed ticket panel (creator ID is used for the transcript DM)
+        view = ClosedTicketView(interaction.channel, state.user_id)
         await interaction.response.send_message(
             "🔒 Ticket closed. Please choose an action:",
             view=view
@@ -494,7 +1876,7 @@ class ClosedTicketView(ui.View):
     async def dm_transcript_to_user(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.defer()
         try:
-            creator = await interaction.guild.fetch_member(self.creator_id)
+            creator = await member_cache.fetch(interaction.guild, self.creator_id)
             transcript = await create_transcript(self.channel)
             
             await creator.send(
@@ -538,7 +1920,7 @@ class SimpleTicketView(ui.View):
             "fields": {"Description": "Created via simple panel"},
             "attachments": []
         }
-        await create_advanced_ticket(interaction, custom_data, panel_id=self.panel_id)
+        await submit_ticket(interaction, custom_data, panel_id=self.panel_id)
 
 @bot.command()
 @commands.is_owner()
@@ -707,6 +2089,10 @@ async def create_ticket_preset(
         json.dumps(fields_data) if fields_data else None
     ))
     conn.commit()
+    permission_policies.invalidate(interaction.guild.id)
+    
+    c.execute("SELECT preset_id FROM ticket_presets WHERE guild_id = ? AND name = ?", (interaction.guild.id, name.lower()))
+    preset_index.add(interaction.guild.id, name.lower(), c.fetchone()[0])
     
     await send_popup(
         interaction,
@@ -718,11 +2104,14 @@ async def create_ticket_preset(
 @bot.tree.command(name="ticket", description="Create a ticket from a preset")
 async def create_ticket_from_preset(interaction: discord.Interaction, preset: str):
     # Don't defer here - we need to respond with a modal immediately
-    c.execute("SELECT preset_id FROM ticket_presets WHERE guild_id = ? AND name = ?", 
-              (interaction.guild.id, preset.lower()))
-    result = c.fetchone()
-    
-    if not result:
+    preset_id = preset_index.lookup(interaction.guild.id, preset.lower())
+    if not preset_id and len(preset) == CHOICE_MAX_LENGTH:
+        # Autocomplete sends names longer than a choice value allows as their prefix
+        matches = list(itertools.islice(preset_index.search(interaction.guild.id, preset.lower()), 2))
+        if len(matches) == 1:
+            preset_id = matches[0][1]
+    
+    if not preset_id:
         await send_popup(
             interaction,
             "❌ Preset Not Found",
@@ -731,7 +2120,6 @@ async def create_ticket_from_preset(interaction: discord.Interaction, preset: st
         )
         return
     
-    preset_id = result[0]
     if not await check_panel_permission(interaction, preset_id=preset_id):
         await send_popup(
             interaction,
@@ -744,13 +2132,25 @@ async def create_ticket_from_preset(interaction: discord.Interaction, preset: st
     # Send the modal as the initial response
     await interaction.response.send_modal(AdvancedTicketModal(preset_id=preset_id))
 
+@create_ticket_from_preset.autocomplete("preset")
+async def preset_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    # Only offer presets the caller is allowed to open
+    choices = []
+    for name, preset_id in preset_index.search(interaction.guild.id, current.lower()):
+        if permission_policies.check(interaction.user, preset_id=preset_id):
+            display = name if len(name) <= CHOICE_MAX_LENGTH else name[:CHOICE_MAX_LENGTH - 1] + "…"
+            choices.append(app_commands.Choice(name=display, value=name[:CHOICE_MAX_LENGTH]))
+            if len(choices) == AUTOCOMPLETE_LIMIT:
+                break
+    return choices
+
 # Command to list available presets
 @bot.tree.command(name="listpresets", description="List available ticket presets")
-async def list_presets(interaction: discord.Interaction):
-    c.execute("SELECT name, description FROM ticket_presets WHERE guild_id = ?", (interaction.guild.id,))
-    presets = c.fetchall()
+async def list_presets(interaction: discord.Interaction, page: Optional[int] = 1):
+    c.execute("SELECT COUNT(*) FROM ticket_presets WHERE guild_id = ?", (interaction.guild.id,))
+    total = c.fetchone()[0]
     
-    if not presets:
+    if not total:
         await send_popup(
             interaction,
             "❌ No Presets",
@@ -759,10 +2159,17 @@ async def list_presets(interaction: discord.Interaction):
         )
         return
     
+    pages = (total + PRESETS_PAGE_SIZE - 1) // PRESETS_PAGE_SIZE
+    page = min(max(page or 1, 1), pages)
+    c.execute("SELECT name, description FROM ticket_presets WHERE guild_id = ? ORDER BY name LIMIT ? OFFSET ?",
+              (interaction.guild.id, PRESETS_PAGE_SIZE, (page - 1) * PRESETS_PAGE_SIZE))
+    presets = c.fetchall()
+    
     embed = discord.Embed(
         title="Available Ticket Presets",
         color=discord.Color.blue()
     )
+    embed.set_footer(text=f"Page {page}/{pages} • {total} presets")
     
     for name, description in presets:
         embed.add_field(
@@ -777,9 +2184,7 @@ async def list_presets(interaction: discord.Interaction):
 @bot.tree.command(name="setticketcategory", description="Set the category for new tickets")
 @app_commands.default_permissions(administrator=True)
 async def set_ticket_category(interaction: discord.Interaction, category: discord.CategoryChannel):
-    c.execute("INSERT OR REPLACE INTO guild_config (guild_id, category_id) VALUES (?, ?)",
-            (interaction.guild.id, category.id))
-    conn.commit()
+    set_guild_config(interaction.guild.id, "category_id", category.id)
     
     await send_popup(
         interaction,
@@ -791,9 +2196,8 @@ async def set_ticket_category(interaction: discord.Interaction, category: discor
 @bot.tree.command(name="setticketrole", description="Set which role can create tickets")
 @app_commands.default_permissions(administrator=True)
 async def set_ticket_role(interaction: discord.Interaction, role: discord.Role):
-    c.execute("INSERT OR REPLACE INTO guild_config (guild_id, ticket_role_id) VALUES (?, ?)",
-            (interaction.guild.id, role.id))
-    conn.commit()
+    set_guild_config(interaction.guild.id, "ticket_role_id", role.id)
+    permission_policies.invalidate(interaction.guild.id)
     
     await send_popup(
         interaction,
@@ -805,9 +2209,7 @@ async def set_ticket_role(interaction: discord.Interaction, role: discord.Role):
 @bot.tree.command(name="setpingrole", description="Set which role gets pinged in new tickets")
 @app_commands.default_permissions(administrator=True)
 async def set_ping_role(interaction: discord.Interaction, role: discord.Role):
-    c.execute("INSERT OR REPLACE INTO guild_config (guild_id, ping_role_id) VALUES (?, ?)",
-            (interaction.guild.id, role.id))
-    conn.commit()
+    set_guild_config(interaction.guild.id, "ping_role_id", role.id)
     
     await send_popup(
         interaction,
@@ -815,6 +2217,19 @@ async def set_ping_role(interaction: discord.Interaction, role: discord.Role):
         f"Ticket ping role successfully set to {role.mention}"
     )
 
+# Command to limit users to one open ticket per panel/preset
+@bot.tree.command(name="setticketlimit", description="Allow only one open ticket per user for each panel or preset")
+@app_commands.default_permissions(administrator=True)
+async def set_ticket_limit(interaction: discord.Interaction, enabled: bool):
+    set_guild_config(interaction.guild.id, "one_ticket_per_user", int(enabled))
+    
+    await send_popup(
+        interaction,
+        "✅ Ticket Limit Set",
+        "Users can now only have one open ticket per panel or preset." if enabled
+        else "Users can now open multiple tickets of the same type."
+    )
+
 # Command to get ticket stats
 @bot.tree.command(name="ticketstats", description="Show ticket statistics")
 @app_commands.default_permissions(manage_guild=True)
@@ -844,14 +2259,195 @@ async def ticket_stats(interaction: discord.Interaction):
     claimed_count = c.fetchone()[0]
     embed.add_field(name="Claimed Tickets", value=str(claimed_count), inline=True)
     
+    c.execute("SELECT COUNT(*) FROM archive.archived_tickets WHERE guild_id = ?", (interaction.guild.id,))
+    archived_count = c.fetchone()[0]
+    embed.add_field(name="Archived Tickets", value=str(archived_count), inline=True)
+    
     await interaction.response.send_message(embed=embed)
 
+# Command to search past tickets
+@bot.tree.command(name="searchtickets", description="Search ticket contents and transcripts")
+@app_commands.default_permissions(manage_guild=True)
+async def search_tickets(
+    interaction: discord.Interaction,
+    query: str,
+    status: Optional[Literal["open", "claimed", "closed"]] = None,
+    priority: Optional[Literal["low", "medium", "high", "critical"]] = None,
+    preset: Optional[str] = None,
+    page: Optional[int] = 1
+):
+    # Ranking a common term over a large index can take a while, so answer Discord first
+    await interaction.response.defer(ephemeral=True)
+    
+    match = build_search_query(interaction.guild.id, query)
+    if not match:
+        await send_popup(
+            interaction,
+            "❌ Invalid Query",
+            "Please enter at least one word to search for!",
+            is_error=True
+        )
+        return
+    
+    # Best-ranked hit per ticket across the hot and archive indexes, filtered against the ticket row
+    filters = ["(t.id IS NOT NULL OR a.id IS NOT NULL)"]
+    params = []
+    if status:
+        filters.append("COALESCE(t.status, a.status) = ?")
+        params.append(status)
+    if priority:
+        filters.append("COALESCE(t.priority, a.priority) = ?")
+        params.append(priority)
+    if preset:
+        filters.append("COALESCE(t.preset_id, a.preset_id) = "
+                       "(SELECT preset_id FROM ticket_presets WHERE guild_id = ? AND name = ?)")
+        params += [interaction.guild.id, preset.lower()]
+    where = f"WHERE {' AND '.join(filters)}"
+    
+    page = max(page or 1, 1)
+    needed = page * SEARCH_PAGE_SIZE + 1  # one extra row tells whether another page exists
+    try:
+        # Without filters only the top hits of each index are ranked and grouped, so a common
+        # term costs a bounded sort instead of grouping every match. Filters can discard any
+        # share of those hits, so filtered searches, and windows that come up short, group
+        # every match in a single pass.
+        window = needed * len(SEARCH_KINDS) if len(filters) == 1 else 0
+        while True:
+            top = "ORDER BY rank LIMIT ?" if window else ""
+            limits = (window,) if window else ()
+            c.execute(f'''
+            SELECT s.ticket_id, COALESCE(t.channel_id, a.channel_id), COALESCE(t.status, a.status),
+                   COALESCE(t.priority, a.priority), COALESCE(t.created_at, a.created_at), s.hit
+            FROM (
+                SELECT ticket_id, MIN(score) AS score, hit FROM (
+                    SELECT * FROM (
+                        SELECT ticket_id, rank AS score, rowid AS hit
+                        FROM ticket_search WHERE ticket_search MATCH ? {top}
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT rowid / {len(SEARCH_KINDS)}, rank, rowid
+                        FROM archive.archived_search WHERE archived_search MATCH ? {top}
+                    )
+                ) GROUP BY ticket_id
+            ) s
+            LEFT JOIN tickets t ON t.id = s.ticket_id
+            LEFT JOIN archive.archived_tickets a ON a.id = s.ticket_id
+            {where}
+            ORDER BY s.score
+            LIMIT ?
+            ''', (match, *limits, match, *limits, *params, needed))
+            results = c.fetchall()
+            if len(results) >= needed or not window:
+                break
+            window = 0  # every match
+        results = results[(page - 1) * SEARCH_PAGE_SIZE:]
+        has_more = len(results) > SEARCH_PAGE_SIZE
+        results = results[:SEARCH_PAGE_SIZE]
+    except sqlite3.OperationalError as e:
+        await send_popup(interaction, "❌ Search Failed", f"Could not run search: {e}", is_error=True)
+        return
+    
+    if not results:
+        await send_popup(
+            interaction,
+            "🔍 No Results",
+            "No tickets matched your search." if page == 1 else "There are no more results.",
+            is_error=True
+        )
+        return
+    
+    # Snippets only for the hits on this page
+    hits = [row[5] for row in results]
+    c.execute(f'''
+    SELECT rowid, snippet(ticket_search, 0, '**', '**', '…', 16)
+    FROM ticket_search WHERE ticket_search MATCH ? AND rowid IN ({",".join("?" * len(hits))})
+    ''', (match, *hits))
+    snippets = dict(c.fetchall())
+    # The archive index is contentless, so archived hits are excerpted from their payload
+    archived_hits = [row for row in results if row[5] not in snippets]
+    if archived_hits:
+        c.execute(f'''
+        SELECT id, payload FROM archive.archived_tickets WHERE id IN ({",".join("?" * len(archived_hits))})
+        ''', [row[0] for row in archived_hits])
+        payloads = dict(c.fetchall())
+        kinds = {code: kind for kind, code in SEARCH_KINDS.items()}
+        for ticket_id, _, _, _, _, hit in archived_hits:
+            if ticket_id in payloads:
+                archived = json.loads(zlib.decompress(payloads[ticket_id]).decode("utf-8"))
+                snippets[hit] = build_snippet(archived.get(kinds[hit % len(SEARCH_KINDS)]) or "", query)
+    
+    embed = discord.Embed(
+        title=f"Ticket Search: {query[:200]}",
+        color=discord.Color.blue()
+    )
+    for ticket_id, channel_id, ticket_status, ticket_priority, created_at, hit in results:
+        embed.add_field(
+            name=f"Ticket {ticket_id} • {ticket_status.capitalize()} • {(ticket_priority or 'medium').capitalize()}",
+            value=f"<#{channel_id}> • {str(created_at)[:10]}\n{snippets.get(hit, '')}"[:1024],
+            inline=False
+        )
+    embed.set_footer(text=f"Page {page} • more results on page {page + 1}" if has_more else f"Page {page}")
+    
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+# Command to restore an archived ticket
+@bot.tree.command(name="restoreticket", description="Restore an archived ticket and its transcript")
+@app_commands.default_permissions(administrator=True)
+async def restore_ticket(interaction: discord.Interaction, ticket_id: int):
+    archived = restore_archived_ticket(interaction.guild.id, ticket_id)
+    if not archived:
+        await send_popup(
+            interaction,
+            "❌ Not Found",
+            "No archived ticket with that ID exists in this server!",
+            is_error=True
+        )
+        return
+    
+    ticket = archived["ticket"]
+    embed = discord.Embed(
+        title=f"Ticket {ticket_id} Restored",
+        description="The ticket is back in the active database and will be archived again once it ages out.",
+        color=discord.Color.green()
+    )
+    embed.add_field(name="Created by", value=f"<@{ticket['user_id']}>", inline=True)
+    embed.add_field(name="Closed", value=str(ticket["closed_at"])[:10], inline=True)
+    
+    if archived["transcript"]:
+        transcript = discord.File(
+            io.BytesIO(archived["transcript"].encode("utf-8")),
+            filename=f"transcript-{ticket_id}.txt"
+        )
+        await interaction.response.send_message(embed=embed, file=transcript, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    await log_action(interaction.guild.id, f"Archived ticket {ticket_id} restored by {interaction.user}")
+
+# Confirmation prompt for destructive admin commands
+class ConfirmView(ui.View):
+    def __init__(self):
+        super().__init__(timeout=30)
+        self.value = None
+    
+    @ui.button(label="Confirm", style=discord.ButtonStyle.red)
+    async def confirm(self, inter: discord.Interaction, button: ui.Button):
+        self.value = True
+        await inter.response.defer()
+        self.stop()
+    
+    @ui.button(label="Cancel", style=discord.ButtonStyle.gray)
+    async def cancel(self, inter: discord.Interaction, button: ui.Button):
+        self.value = False
+        await inter.response.send_message("Cancelled", ephemeral=True)
+        self.stop()
+
 # Command to force close a ticket
 @bot.tree.command(name="forceclose", description="Force close a ticket")
 @app_commands.default_permissions(administrator=True)
 async def force_close(interaction: discord.Interaction, reason: str = "Admin closure"):
-    c.execute("SELECT * FROM tickets WHERE channel_id = ? AND status != 'closed'", (interaction.channel.id,))
-    if not c.fetchone():
+    state = get_ticket_state(interaction.channel.id)
+    if not state or state.status == "closed":
         await send_popup(
             interaction,
             "❌ Invalid Channel",
@@ -860,25 +2456,7 @@ async def force_close(interaction: discord.Interaction, reason: str = "Admin clo
         )
         return
         
-    # Create a confirmation view
-    class ConfirmClose(ui.View):
-        def __init__(self):
-            super().__init__(timeout=30)
-            self.value = None
-        
-        @ui.button(label="Confirm", style=discord.ButtonStyle.red)
-        async def confirm(self, inter: discord.Interaction, button: ui.Button):
-            self.value = True
-            await inter.response.defer()
-            self.stop()
-        
-        @ui.button(label="Cancel", style=discord.ButtonStyle.gray)
-        async def cancel(self, inter: discord.Interaction, button: ui.Button):
-            self.value = False
-            await inter.response.send_message("Cancelled", ephemeral=True)
-            self.stop()
-    
-    view = ConfirmClose()
+    view = ConfirmView()
     await interaction.response.send_message(
         embed=discord.Embed(
             title="⚠️ Confirm Force Close",
@@ -892,9 +2470,7 @@ async def force_close(interaction: discord.Interaction, reason: str = "Admin clo
     await view.wait()
     if view.value:
         # Proceed with closing
-        c.execute("UPDATE tickets SET status = ? WHERE channel_id = ?",
-                ("closed", interaction.channel.id))
-        conn.commit()
+        mark_ticket_closed(interaction.channel.id)
         
         try:
             transcript = await create_transcript(interaction.channel)
@@ -922,7 +2498,312 @@ async def force_close(interaction: discord.Interaction, reason: str = "Admin clo
     else:
         await interaction.followup.send("Timed out", ephemeral=True)
 
+# Command to close tickets in bulk
+@bot.tree.command(name="bulkclose", description="Close, archive and delete all tickets matching the filters")
+@app_commands.default_permissions(administrator=True)
+async def bulk_close(
+    interaction: discord.Interaction,
+    status: Optional[Literal["open", "claimed", "closed"]] = None,
+    priority: Optional[Literal["low", "medium", "high", "critical"]] = None,
+    preset: Optional[str] = None,
+    older_than_days: Optional[int] = None,
+    concurrency: Optional[app_commands.Range[int, 1, 10]] = 4
+):
+    # Without a status filter every active (open or claimed) ticket matches
+    filters = ["guild_id = ?"]
+    params = [interaction.guild.id]
+    if status:
+        filters.append("status = ?")
+        params.append(status)
+    else:
+        filters.append("status IN ('open', 'claimed')")
+    if priority:
+        filters.append("priority = ?")
+        params.append(priority)
+    if preset:
+        filters.append("preset_id = (SELECT preset_id FROM ticket_presets WHERE guild_id = ? AND name = ?)")
+        params += [interaction.guild.id, preset.lower()]
+    if older_than_days:
+        filters.append("created_at < ?")
+        params.append((datetime.datetime.now() - datetime.timedelta(days=older_than_days)).isoformat())
+    
+    c.execute(f"SELECT id, channel_id FROM tickets WHERE {' AND '.join(filters)}", params)
+    matches = [(ticket_id, channel) for ticket_id, channel_id in c.fetchall()
+               if (channel := interaction.guild.get_channel(channel_id))]
+    if not matches:
+        await send_popup(
+            interaction,
+            "❌ No Tickets",
+            "No ticket channels match those filters!",
+            is_error=True
+        )
+        return
+    
+    view = ConfirmView()
+    await interaction.response.send_message(
+        embed=discord.Embed(
+            title="⚠️ Confirm Bulk Close",
+            description=f"This will close and delete **{len(matches)}** ticket channels. "
+                        "Transcripts will be uploaded to the log channel as a single bundle.",
+            color=discord.Color.orange()
+        ),
+        view=view,
+        ephemeral=True
+    )
+    
+    await view.wait()
+    if view.value is None:
+        await interaction.followup.send("Timed out", ephemeral=True)
+    if not view.value:
+        return
+    
+    # Record the operation first so it can resume if the bot restarts midway
+    c.execute("BEGIN")
+    try:
+        c.execute("INSERT INTO bulk_operations (guild_id, requested_by, concurrency) VALUES (?, ?, ?)",
+                  (interaction.guild.id, interaction.user.id, concurrency))
+        op_id = c.lastrowid
+        c.executemany("INSERT INTO bulk_operation_items (op_id, channel_id, ticket_id, channel_name) VALUES (?, ?, ?, ?)",
+                      [(op_id, channel.id, ticket_id, channel.name) for ticket_id, channel in matches])
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    
+    progress = await interaction.followup.send(f"⏳ Bulk close #{op_id}: 0/{len(matches)} tickets processed...",
+                                               ephemeral=True, wait=True)
+    
+    async def report(done: int, total: int):
+        try:
+            await progress.edit(content=f"⏳ Bulk close #{op_id}: {done}/{total} tickets processed...")
+        except discord.HTTPException:
+            pass
+    
+    done, failed = await start_bulk_operation(op_id, report)
+    try:
+        await progress.edit(content=f"✅ Bulk close #{op_id} finished: {done} tickets closed, {failed} failed.")
+    except discord.HTTPException:
+        pass
+
+# Startup reconciliation between ticket rows and the guild's live channels
+async def reconcile_guild(guild: discord.Guild):
+    c.execute("SELECT id, channel_id FROM tickets WHERE guild_id = ? AND status IN ('open', 'claimed')", (guild.id,))
+    active = dict(c.fetchall())
+    live = {channel.id: channel for channel in guild.text_channels}
+    
+    # Rows whose channel was deleted while the bot was offline
+    missing = [(ticket_id, channel_id) for ticket_id, channel_id in active.items() if channel_id not in live]
+    
+    # Channels in ticket categories without an active row. Jobs still being provisioned
+    # own their channels, and closed tickets keep theirs until someone deletes them.
+    c.execute("SELECT category_id FROM guild_config WHERE guild_id = ?", (guild.id,))
+    result = c.fetchone()
+    category_ids = set(category_pool.overflow_ids(guild.id))
+    if result and result[0]:
+        category_ids.add(result[0])
+    default_category = discord.utils.get(guild.categories, name=DEFAULT_CATEGORY_NAME)
+    if default_category:
+        category_ids.add(default_category.id)
+    c.execute("SELECT job_id, channel_id FROM ticket_jobs WHERE guild_id = ? AND status IN ('pending', 'running')",
+              (guild.id,))
+    jobs = c.fetchall()
+    tracked = set(active.values()) | {channel_id for _, channel_id in jobs}
+    # A job interrupted before checkpointing its channel only knows it by the topic marker
+    markers = {job_channel_marker(job_id) for job_id, channel_id in jobs if not channel_id}
+    candidates = [channel for channel in live.values()
+                  if channel.category_id in category_ids and channel.id not in tracked
+                  and not any((channel.topic or "").endswith(marker) for marker in markers)]
+    candidate_ids = [channel.id for channel in candidates]
+    known = set()
+    for start in range(0, len(candidate_ids), 500):
+        chunk = candidate_ids[start:start + 500]
+        c.execute(f"SELECT channel_id FROM tickets WHERE channel_id IN ({','.join('?' * len(chunk))})", chunk)
+        known.update(row[0] for row in c.fetchall())
+        # Closed tickets keep their channel after being archived, too
+        c.execute(f"SELECT channel_id FROM archive.archived_tickets WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                  chunk)
+        known.update(row[0] for row in c.fetchall())
+    
+    # An untracked channel is adopted when exactly one member has an overwrite on it
+    adopted, flagged = [], []
+    for channel in candidates:
+        if channel.id in known:
+            continue
+        members = [target for target in channel.overwrites
+                   if not isinstance(target, discord.Role) and target.id != bot.user.id]
+        if len(members) == 1:
+            adopted.append((channel, members[0].id))
+        else:
+            flagged.append(channel)
+    
+    c.execute("SELECT channel_id FROM flagged_channels WHERE guild_id = ?", (guild.id,))
+    reported = {row[0] for row in c.fetchall()}
+    new_flagged = [channel for channel in flagged if channel.id not in reported]
+    flagged_changed = reported != {channel.id for channel in flagged}
+    
+    if not missing and not adopted and not flagged_changed:
+        return
+    
+    closed_at = datetime.datetime.now().isoformat()
+    c.execute("SELECT COALESCE(MAX(id), 0) FROM tickets")
+    last_id = c.fetchone()[0]
+    c.execute("BEGIN")
+    try:
+        c.executemany("UPDATE tickets SET status = 'closed', closed_at = ? WHERE id = ?",
+                      [(closed_at, ticket_id) for ticket_id, _ in missing])
+        c.executemany("DELETE FROM ticket_timers WHERE channel_id = ?", [(channel_id,) for _, channel_id in missing])
+        c.executemany('''
+        INSERT INTO tickets (user_id, channel_id, status, created_at, ticket_type, assigned_to, priority, custom_data, guild_id)
+        VALUES (?, ?, 'open', ?, 'adopted', ?, 'medium', ?, ?)
+        ''', [
+            (user_id, channel.id, channel.created_at.isoformat(), SUPPORT_ROLE_ID if SUPPORT_ROLE_ID else user_id,
+             json.dumps({"title": channel.name, "fields": {}, "attachments": []}), guild.id)
+            for channel, user_id in adopted
+        ])
+        if flagged_changed:
+            # Channels that were adopted, deleted or ticketed since drop out of the list
+            c.execute("DELETE FROM flagged_channels WHERE guild_id = ?", (guild.id,))
+            c.executemany("INSERT INTO flagged_channels (channel_id, guild_id) VALUES (?, ?)",
+                          [(channel.id, guild.id) for channel in flagged])
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    
+    for _, channel_id in missing:
+        scheduler.forget(channel_id)
+        ticket_states.pop(channel_id, None)
+    for channel, _ in adopted:
+        scheduler.start(channel.id)
+    if adopted:
+        index_missing_fields(last_id, len(adopted))
+    
+    if not missing and not adopted and not new_flagged:
+        return
+    summary = [f"🔄 Ticket reconciliation: {len(missing)} closed (channel deleted), "
+               f"{len(adopted)} adopted, {len(new_flagged)} need review"]
+    if adopted:
+        summary.append("Adopted: " + " ".join(channel.mention for channel, _ in adopted[:20]))
+    if new_flagged:
+        summary.append("Untracked channels in ticket categories: " + " ".join(channel.mention for channel in new_flagged[:20]))
+    await log_action(guild.id, "\n".join(summary))
+
+# Bulk close: tickets are processed by a bounded pool of tasks. Each item checkpoints
+# its transcript before the channel is deleted, so an interrupted run resumes cleanly
+# and the final bundle still contains every transcript.
+BULK_PROGRESS_EVERY = 10
+BULK_BUNDLE_MAX_BYTES = 8 * 1024 * 1024  # stay under the default upload limit
+
+bulk_tasks: Dict[int, asyncio.Task] = {}
+
+async def bulk_close_item(guild: discord.Guild, op_id: int, channel_id: int, state: str):
+    channel = guild.get_channel(channel_id)
+    if state == "pending":
+        transcript = await build_transcript(channel) if channel else ""
+        c.execute("UPDATE bulk_operation_items SET state = 'transcribed', transcript = ? WHERE op_id = ? AND channel_id = ?",
+                  (zlib.compress(transcript.encode("utf-8")), op_id, channel_id))
+        conn.commit()
+    
+    mark_ticket_closed(channel_id)
+    if channel:
+        await channel.delete(reason=f"Bulk close #{op_id}")
+    c.execute("UPDATE bulk_operation_items SET state = 'done' WHERE op_id = ? AND channel_id = ?", (op_id, channel_id))
+    conn.commit()
+
+def zip_entry_size(name: str, data: bytes) -> int:
+    # Deflated size plus the local header and central directory record the entry adds
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = len(compressor.compress(data)) + len(compressor.flush())
+    return compressed + 2 * len(name.encode("utf-8")) + 30 + 46 + 16
+
+def build_transcript_bundles(op_id: int) -> List[io.BytesIO]:
+    bundles = []
+    buffer, archive, size = None, None, 0
+    # Transcribed items whose channel couldn't be deleted are included too, since the
+    # items are dropped once the run finishes
+    c.execute("SELECT channel_name, channel_id, transcript FROM bulk_operation_items "
+              "WHERE op_id = ? AND state IN ('transcribed', 'done') AND transcript IS NOT NULL", (op_id,))
+    for channel_name, channel_id, transcript in c.fetchall():
+        name = f"transcript-{channel_name}-{channel_id}.txt"
+        data = zlib.decompress(transcript)
+        entry_size = zip_entry_size(name, data)
+        # A transcript larger than the cap on its own still gets a bundle of its own
+        if archive is None or (size + entry_size > BULK_BUNDLE_MAX_BYTES and archive.namelist()):
+            if archive:
+                archive.close()
+            buffer = io.BytesIO()
+            archive = zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED)
+            bundles.append(buffer)
+            size = 22  # end of central directory record
+        archive.writestr(name, data)
+        size += entry_size
+    if archive:
+        archive.close()
+    for buffer in bundles:
+        buffer.seek(0)
+    return bundles
+
+async def run_bulk_operation(op_id: int, report=None) -> Tuple[int, int]:
+    c.execute("SELECT guild_id, requested_by, concurrency FROM bulk_operations WHERE op_id = ?", (op_id,))
+    guild_id, requested_by, concurrency = c.fetchone()
+    guild = bot.get_guild(guild_id)
+    c.execute("SELECT channel_id, state FROM bulk_operation_items WHERE op_id = ?", (op_id,))
+    items = c.fetchall()
+    
+    total = len(items)
+    counts = {"done": sum(1 for _, state in items if state == "done"), "failed": 0}
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def worker(channel_id: int, state: str):
+        async with slots:
+            try:
+                await bulk_close_item(guild, op_id, channel_id, state)
+                counts["done"] += 1
+            except discord.HTTPException as e:
+                counts["failed"] += 1
+                print(f"Bulk close #{op_id}: error closing channel {channel_id}: {e}")
+            processed = counts["done"] + counts["failed"]
+            if report and processed % BULK_PROGRESS_EVERY == 0:
+                await report(processed, total)
+    
+    if not guild:
+        return counts["done"], counts["failed"]  # resumed once the guild is available again
+    await asyncio.gather(*(worker(channel_id, state) for channel_id, state in items if state != "done"))
+    
+    # One upload per bundle instead of one message per ticket
+    log_channel = bot.get_channel(LOG_CHANNEL_ID) if LOG_CHANNEL_ID else None
+    bundles = build_transcript_bundles(op_id)
+    if log_channel:
+        for part, bundle in enumerate(bundles, start=1):
+            suffix = f"-part{part}" if len(bundles) > 1 else ""
+            try:
+                await log_channel.send(
+                    f"📦 Bulk close #{op_id} by <@{requested_by}>: {counts['done']} tickets closed, {counts['failed']} failed",
+                    file=discord.File(bundle, filename=f"bulk-close-{op_id}{suffix}.zip")
+                )
+            except discord.HTTPException as e:
+                print(f"Bulk close #{op_id}: error uploading transcripts: {e}")
+    
+    c.execute("UPDATE bulk_operations SET status = 'done' WHERE op_id = ?", (op_id,))
+    c.execute("DELETE FROM bulk_operation_items WHERE op_id = ?", (op_id,))
+    conn.commit()
+    return counts["done"], counts["failed"]
+
+def start_bulk_operation(op_id: int, report=None) -> asyncio.Task:
+    task = bulk_tasks[op_id] = asyncio.create_task(run_bulk_operation(op_id, report))
+    task.add_done_callback(lambda _: bulk_tasks.pop(op_id, None))
+    return task
+
+def resume_bulk_operations():
+    c.execute("SELECT op_id FROM bulk_operations WHERE status = 'running'")
+    for (op_id,) in c.fetchall():
+        if op_id not in bulk_tasks:
+            start_bulk_operation(op_id)
+
 # Event handlers
+archive_task: Optional[asyncio.Task] = None
+backfill_task: Optional[asyncio.Task] = None
+
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user.name} (ID: {bot.user.id})")
@@ -933,6 +2814,16 @@ async def on_ready():
         name="for tickets"
     ))
 
+    # Start background maintenance once; on_ready fires again after reconnects
+    global archive_task, backfill_task
+    if ARCHIVE_AFTER_DAYS and archive_task is None:
+        archive_task = asyncio.create_task(archive_loop())
+    if backfill_task is None:
+        backfill_task = asyncio.create_task(backfill_search_index())
+    scheduler.start_loop()
+    provisioning.start()
+    resume_bulk_operations()
+
     # Register persistent views
     bot.add_view(TicketManagementView())  # already timeout=None
     bot.add_view(PriorityView())          # now persistent
@@ -960,6 +2851,48 @@ async def on_ready():
     except Exception as e:
         print(f"Error syncing commands: {e}")
 
+@bot.listen()
+async def on_interaction(interaction: discord.Interaction):
+    # Keeps staff pinned and recent users warm under the lean member cache policy
+    member_cache.remember(interaction.user)
+
+@bot.listen()
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    category_pool.cached(channel.id)
+
+@bot.listen("on_guild_channel_delete")
+async def release_ticket_members(channel: discord.abc.GuildChannel):
+    member_cache.release(channel.id)
+    scheduler.stop(channel.id)
+    ticket_states.pop(channel.id, None)
+    
+    # An overflow category may have emptied out, or been deleted by hand
+    category_id = channel.id if isinstance(channel, discord.CategoryChannel) else channel.category_id
+    if category_id:
+        await category_pool.reclaim(channel.guild, category_id)
+
+@bot.listen()
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    # Role permissions (e.g. administrator) feed into memoized access decisions
+    permission_policies.invalidate(after.guild.id, decisions_only=True)
+
+@bot.listen()
+async def on_guild_role_delete(role: discord.Role):
+    permission_policies.invalidate(role.guild.id, decisions_only=True)
+
+@bot.listen()
+async def on_guild_available(guild: discord.Guild):
+    try:
+        await reconcile_guild(guild)
+    except (sqlite3.Error, discord.HTTPException) as e:
+        print(f"Error reconciling tickets in {guild.name}: {e}")
+
+@bot.listen()
+async def on_message(message: discord.Message):
+    # Any human activity pushes back the idle timers of a ticket channel
+    if not message.author.bot:
+        scheduler.touch(message.channel.id)
+
 
 if __name__ == "__main__":
     bot.run(BOT_TOKEN)